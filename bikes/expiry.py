@@ -0,0 +1,88 @@
+import heapq
+import time
+
+from django.utils import timezone
+
+from bikes.models import Reservation
+
+
+class ReservationExpiryScheduler:
+    """
+    Expires reservations once their `reserved_till` deadline passes.
+
+    Deadlines are kept in a min-heap, so the worker only has to look at the earliest one
+    to know how long it can sleep. New reservations are picked up incrementally by
+    polling for rows reserved after the newest one already known, less an overlap, as
+    a reservation may commit after a newer one was already loaded.
+
+    :param poll_interval: max number of seconds between polls for new reservations
+    :param overlap: number of seconds before the newest known reservation to re-scan
+    """
+
+    def __init__(self, poll_interval: float = 5.0, overlap: float = 60.0):
+        self.poll_interval = poll_interval
+        self.overlap = timezone.timedelta(seconds=overlap)
+        self._heap = []
+        self._scheduled = set()
+        self._last_reserved_at = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def load(self):
+        """
+        Push deadlines of reservations created since the last load onto the heap,
+        re-scanning the overlap window for ones committed late.
+
+        :return: number of newly scheduled reservations
+        """
+        reservations = Reservation.objects.order_by("reserved_at")
+        if self._last_reserved_at is not None:
+            reservations = reservations.filter(
+                reserved_at__gte=self._last_reserved_at - self.overlap
+            )
+        loaded = 0
+        for reservation_id, reserved_at, reserved_till in reservations.values_list(
+            "id", "reserved_at", "reserved_till"
+        ):
+            self._last_reserved_at = reserved_at
+            if reservation_id in self._scheduled:
+                continue
+            heapq.heappush(self._heap, (reserved_till, reservation_id))
+            self._scheduled.add(reservation_id)
+            loaded += 1
+        return loaded
+
+    def expire_due(self, now=None):
+        """
+        Once the earliest deadline passes, expire all overdue reservations in bulk.
+
+        The heap only decides when to run: every reservation overdue by then is expired,
+        whether it was scheduled or not, and due heap entries are dropped, including
+        those of reservations that no longer exist (cancelled or turned into a rent).
+
+        :return: number of expired reservations
+        """
+        now = now or timezone.now()
+        if not self._heap or self._heap[0][0] >= now:
+            return 0
+        while self._heap and self._heap[0][0] < now:
+            _, reservation_id = heapq.heappop(self._heap)
+            self._scheduled.discard(reservation_id)
+        return Reservation.objects.expire_overdue(now)
+
+    def seconds_until_next(self, now=None) -> float:
+        """
+        How long the worker can sleep before either a deadline is due or a poll is needed.
+        """
+        if not self._heap:
+            return self.poll_interval
+        now = now or timezone.now()
+        until_deadline = (self._heap[0][0] - now).total_seconds()
+        return max(0.0, min(until_deadline, self.poll_interval))
+
+    def run_forever(self):
+        while True:
+            self.load()
+            self.expire_due()
+            time.sleep(self.seconds_until_next())
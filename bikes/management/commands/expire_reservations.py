@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from bikes.expiry import ReservationExpiryScheduler
+
+
+class Command(BaseCommand):
+    help = "Expire bike reservations once their reservation time runs out."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Max number of seconds between checks for new reservations.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Expire overdue reservations and exit instead of running forever.",
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ReservationExpiryScheduler(poll_interval=options["poll_interval"])
+        if options["once"]:
+            scheduler.load()
+            expired = scheduler.expire_due()
+            self.stdout.write(f"Expired {expired} reservations.")
+            return
+        self.stdout.write("Watching reservations, press CTRL+C to stop.")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+
+from bikes.models import Bike, BikeStatus, Reservation
+from stations.models import Station
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare denormalized bike counters of stations and users with actual bikes "
+        "and reservations, and optionally fix the ones that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Recompute counters that do not match.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows fixed in a single transaction.",
+        )
+
+    def handle(self, *args, **options):
+        station_mismatches = self.find_station_mismatches()
+        user_mismatches = self.find_user_mismatches()
+        self.stdout.write(
+            f"Found {len(station_mismatches)} stations and {len(user_mismatches)} users "
+            "with mismatched counters."
+        )
+        if options["verbosity"] > 1:
+            for station_id in station_mismatches:
+                self.stdout.write(f"Station {station_id}")
+            for user_id in user_mismatches:
+                self.stdout.write(f"User {user_id}")
+        if not options["fix"]:
+            return
+        # counters are recomputed inside a single UPDATE per batch, so changes made
+        # since the mismatch was found are not overwritten and locks are held briefly
+        for ids in self.batches(station_mismatches, options["batch_size"]):
+            Station.objects.filter(id__in=ids).update_bike_counts()
+        for ids in self.batches(user_mismatches, options["batch_size"]):
+            User.objects.filter(id__in=ids).update_activity_counts()
+        self.stdout.write("Fixed mismatched counters.")
+
+    @staticmethod
+    def find_station_mismatches():
+        # a single grouped pass over bikes, instead of counting per station
+        counts = {
+            row["station"]: (row["total"], row["available"])
+            for row in Bike.objects.filter(station__isnull=False)
+            .order_by()
+            .values("station")
+            .annotate(
+                total=Count("pk"),
+                available=Count("pk", filter=Q(status=BikeStatus.available)),
+            )
+        }
+        return [
+            station_id
+            for station_id, total, available in Station.objects.values_list(
+                "id", "bikes_total", "bikes_available"
+            ).iterator()
+            if counts.get(station_id, (0, 0)) != (total, available)
+        ]
+
+    @staticmethod
+    def find_user_mismatches():
+        rentals = dict(
+            Bike.objects.filter(user__isnull=False)
+            .order_by()
+            .values("user")
+            .annotate(count=Count("pk"))
+            .values_list("user", "count")
+        )
+        reservations = dict(
+            Reservation.objects.order_by()
+            .values("user")
+            .annotate(count=Count("pk"))
+            .values_list("user", "count")
+        )
+        return [
+            user_id
+            for user_id, active_rentals, active_reservations in User.objects.values_list(
+                "id", "active_rentals", "active_reservations"
+            ).iterator()
+            if (rentals.get(user_id, 0), reservations.get(user_id, 0))
+            != (active_rentals, active_reservations)
+        ]
+
+    @staticmethod
+    def batches(ids, batch_size):
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            yield ids[start:end]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-17 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bikes", "0010_malfunction"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="bike",
+            index=models.Index(
+                fields=["station", "status"], name="bike_station_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bike",
+            index=models.Index(fields=["user", "status"], name="bike_user_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="bike",
+            index=models.Index(fields=["status"], name="bike_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["reserved_till"], name="reservation_reserved_till_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-17 18:26
+
+import core.uuids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bikes", "0011_hot_query_indexes"),
+    ]
+
+    # default is applied by Django, not the database, so only the state changes and
+    # tables are not rebuilt; existing rows keep their keys, new rows get uuid7 ones
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="bike",
+                    name="id",
+                    field=models.UUIDField(
+                        default=core.uuids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="malfunction",
+                    name="id",
+                    field=models.UUIDField(
+                        default=core.uuids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="reservation",
+                    name="id",
+                    field=models.UUIDField(
+                        default=core.uuids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,10 +1,11 @@
-import uuid
-
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Prefetch, Value, When
 from django.utils import timezone
 
 from core.exceptions import BusinessLogicError
-from stations.models import Station
+from core.queries import count_subquery
+from core.uuids import uuid7
+from stations.models import Station, StationStatus
 from users.models import User
 
 
@@ -15,8 +16,51 @@ class BikeStatus(models.TextChoices):
     blocked = "blocked"
 
 
+class BikeQuerySet(models.QuerySet):
+    def with_effective_status(self):
+        """
+        Annotate bikes with `effective_status`, which reads reserved bikes with expired
+        reservations as available, even before the expiry worker gets to them.
+        """
+        return self.annotate(
+            effective_status=Case(
+                When(
+                    status=BikeStatus.reserved,
+                    reservation__reserved_till__lt=timezone.now(),
+                    then=Value(BikeStatus.available),
+                ),
+                default=F("status"),
+                output_field=models.CharField(),
+            )
+        )
+
+    def with_related(self):
+        """
+        Fetch users and stations (with their available bike counts) of bikes in constant
+        number of queries, each station being fetched once no matter how many bikes it has.
+        """
+        return self.select_related("user").prefetch_related(
+            Prefetch("station", queryset=Station.objects.with_active_bikes_count())
+        )
+
+    def available(self):
+        return self.with_effective_status().filter(
+            effective_status=BikeStatus.available
+        )
+
+    def rented_by(self, user):
+        return self.filter(status=BikeStatus.rented, user=user)
+
+    def reserved_by(self, user):
+        return (
+            self.with_effective_status()
+            .filter(reservation__user=user, effective_status=BikeStatus.reserved)
+            .select_related("reservation")
+        )
+
+
 class Bike(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     status = models.CharField(
         max_length=9, choices=BikeStatus.choices, default=BikeStatus.available
     )
@@ -35,28 +79,161 @@ class Bike(models.Model):
         related_name="bikes",
     )
 
+    objects = BikeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # bikes at station, rented bikes of user and listings by status
+            models.Index(fields=["station", "status"], name="bike_station_status_idx"),
+            models.Index(fields=["user", "status"], name="bike_user_status_idx"),
+            models.Index(fields=["status"], name="bike_status_idx"),
+        ]
+
     def __str__(self):
         return f"Bike {self.id} ({self.status}), at station {self.station.name}"
 
-    def rent(self, user):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        bike = super().from_db(db, field_names, values)
+        bike._counted_state = (
+            bike.__dict__.get("station_id"),
+            bike.__dict__.get("status"),
+            bike.__dict__.get("user_id"),
+        )
+        return bike
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._counted_state = (self.station_id, self.status, self.user_id)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._move_counters(self.station_id, self.status, self.user_id)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self._move_counters(None, None, None)
+        return result
+
+    def _move_counters(self, station_id, status, user_id):
+        """
+        Move this bike in denormalized station and user counters from the station,
+        status and user they last accounted for to given ones.
+        """
+        old_station_id, old_status, old_user_id = getattr(
+            self, "_counted_state", (None, None, None)
+        )
+        old_available = int(old_status == BikeStatus.available)
+        new_available = int(status == BikeStatus.available)
+        if old_station_id == station_id:
+            if station_id and old_available != new_available:
+                self._add_station_bikes(
+                    station_id, available=new_available - old_available
+                )
+        else:
+            if old_station_id:
+                self._add_station_bikes(
+                    old_station_id, total=-1, available=-old_available
+                )
+            if station_id:
+                self._add_station_bikes(station_id, total=1, available=new_available)
+        if old_user_id != user_id:
+            if old_user_id:
+                User.objects.filter(id=old_user_id).add_activity(rentals=-1)
+            if user_id:
+                User.objects.filter(id=user_id).add_activity(rentals=1)
+                if self._meta.get_field("user").is_cached(self):
+                    self.user.active_rentals += 1
+        self._counted_state = (station_id, status, user_id)
+
+    def _add_station_bikes(self, station_id, total: int = 0, available: int = 0):
+        Station.objects.filter(id=station_id).add_bikes(total, available)
+        # keep already loaded station in line with the database, so it can be serialized
+        station_field = self._meta.get_field("station")
+        if station_field.is_cached(self) and self.station_id == station_id:
+            self.station.bikes_total += total
+            self.station.bikes_available += available
+
+    @property
+    def current_status(self) -> str:
+        # prefer status annotated by BikeQuerySet.with_effective_status if present
+        return getattr(self, "effective_status", self.status)
+
+    def rent(self, user) -> bool:
+        """
+        Rent the bike out with a single conditional UPDATE.
+
+        The bike is only rented if its status, station and reservation did not change
+        since it was loaded, so concurrent rents of the same bike can't both succeed, nor
+        can a bike be rented once it is reserved by someone else.
+
+        :return: whether the bike was rented, False if it changed in the meantime
+        """
         # the fact we have to use hasattr is a shameful stain on Django's reputation
         # source: https://stackoverflow.com/a/40743258/8888856
-        if hasattr(self, "reservation"):
-            if self.reservation.user != user:
-                raise BusinessLogicError(
-                    "User renting the bike is not the one that reserved the bike"
-                )
-            self.reservation.delete()
-        self.user = user
-        self.status = BikeStatus.rented
-        self.station = None
-        self.save()
+        reserved = hasattr(self, "reservation")
+        if reserved and self.reservation.user_id != user.id:
+            raise BusinessLogicError(
+                "User renting the bike is not the one that reserved the bike"
+            )
+        with transaction.atomic():
+            bikes = Bike.objects.filter(
+                id=self.id, status=self.status, station_id=self.station_id
+            )
+            if reserved:
+                bikes = bikes.filter(reservation__id=self.reservation.id)
+            else:
+                bikes = bikes.filter(reservation__isnull=True)
+            rented = bikes.update(status=BikeStatus.rented, user=user, station=None)
+            if not rented:
+                return False
+            if reserved:
+                deleted, _ = self.reservation.delete()
+                self._meta.get_field("reservation").delete_cached_value(self)
+                if not deleted:
+                    transaction.set_rollback(True)
+                    return False
+            self.user = user
+            self.status = BikeStatus.rented
+            self.station = None
+            self._move_counters(None, BikeStatus.rented, user.id)
+        return True
 
-    def return_to_station(self, station: Station):
-        self.station = station
-        self.status = BikeStatus.available
-        self.user = None
-        self.save()
+    def return_to_station(self, station: Station) -> bool:
+        """
+        Return the bike to a working station that has a free place.
+
+        The place is taken by an UPDATE of station counters guarded by the station
+        capacity, so concurrent returns can't put a station over its limit.
+
+        :return: whether the bike was returned, False if the station is full or blocked,
+            or the bike changed since it was loaded
+        """
+        with transaction.atomic():
+            if not Station.objects.filter(
+                id=station.id,
+                status=StationStatus.working,
+                bikes_total__lt=F("bikesLimit"),
+            ).add_bikes(total=1, available=1):
+                return False
+            returned = Bike.objects.filter(
+                id=self.id, status=self.status, station_id=self.station_id
+            ).update(status=BikeStatus.available, station=station, user=None)
+            if not returned:
+                transaction.set_rollback(True)
+                return False
+            station.bikes_total += 1
+            station.bikes_available += 1
+            # station counters already account for the bike, only user ones are left
+            _, _, user_id = getattr(self, "_counted_state", (None, None, None))
+            self._counted_state = (station.id, BikeStatus.available, user_id)
+            self.station = station
+            self.status = BikeStatus.available
+            self.user = None
+            self._move_counters(station.id, BikeStatus.available, None)
+        return True
 
     def reserve(self, user: User):
         time = timezone.now()
@@ -70,9 +247,28 @@ class Bike(models.Model):
         self.save()
 
     def cancel_reservation(self):
-        self.reservation.delete()
-        self.status = BikeStatus.available
-        self.save()
+        """
+        Cancel reservation of the bike and make it available.
+
+        If the reservation is gone already, e.g. expired by the worker in the meantime,
+        the bike is left as it is in the database and reloaded.
+        """
+        with transaction.atomic():
+            deleted, _ = self.reservation.delete()
+            # drop cached reservation, so hasattr(self, "reservation") is False again
+            self._meta.get_field("reservation").delete_cached_value(self)
+            if deleted and Bike.objects.filter(
+                id=self.id, status=BikeStatus.reserved
+            ).update(status=BikeStatus.available):
+                self._counted_state = (
+                    self.station_id,
+                    BikeStatus.reserved,
+                    self.user_id,
+                )
+                self.status = BikeStatus.available
+                self._move_counters(self.station_id, self.status, self.user_id)
+                return
+        self.refresh_from_db()
 
     def check_reservation(self):
         if hasattr(self, "reservation"):
@@ -88,8 +284,45 @@ class Bike(models.Model):
         self.save()
 
 
+class ReservationQuerySet(models.QuerySet):
+    def active(self, now=None):
+        return self.filter(reserved_till__gte=now or timezone.now())
+
+    def overdue(self, now=None):
+        return self.filter(reserved_till__lt=now or timezone.now())
+
+    def cancel(self) -> int:
+        """
+        Cancel all reservations in one transaction and make their bikes available.
+
+        Costs a constant number of queries regardless of how many reservations there are.
+
+        :return: number of cancelled reservations
+        """
+        with transaction.atomic():
+            bikes = Bike.objects.filter(id__in=self.values("bike_id"))
+            bikes.filter(status=BikeStatus.reserved).update(status=BikeStatus.available)
+            Station.objects.filter(
+                id__in=bikes.values("station_id")
+            ).update_bike_counts()
+            User.objects.filter(id__in=self.values("user_id")).update(
+                active_reservations=F("active_reservations")
+                - count_subquery(self, "user")
+            )
+            cancelled, _ = self.delete()
+        return cancelled
+
+    def expire_overdue(self, now=None) -> int:
+        """
+        Expire all overdue reservations, see `cancel`.
+
+        :return: number of expired reservations
+        """
+        return self.overdue(now).cancel()
+
+
 class Reservation(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     bike = models.OneToOneField(
         "bikes.Bike",
         on_delete=models.CASCADE,
@@ -103,9 +336,41 @@ class Reservation(models.Model):
     reserved_at = models.DateTimeField()
     reserved_till = models.DateTimeField()
 
+    objects = ReservationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # overdue reservations, user is indexed as a foreign key already
+            models.Index(
+                fields=["reserved_till"], name="reservation_reserved_till_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self._add_user_reservations(1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            # nothing to take off if the reservation was deleted in the meantime
+            deleted = result[1].get(self._meta.label, 0)
+            if deleted:
+                self._add_user_reservations(-deleted)
+        return result
+
+    def _add_user_reservations(self, reservations: int):
+        User.objects.filter(id=self.user_id).add_activity(reservations=reservations)
+        # keep already loaded user in line with the database, for limit checks
+        if self._meta.get_field("user").is_cached(self):
+            self.user.active_reservations += reservations
+
 
 class Malfunction(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     bike = models.OneToOneField(
         "bikes.Bike",
         on_delete=models.CASCADE,
@@ -11,6 +11,7 @@ from users.serializers import ReadUserSerializer
 class ReadBikeSerializer(serializers.ModelSerializer):
     station = StationSerializer()
     user = ReadUserSerializer()
+    status = CharField(source="current_status", read_only=True)
 
     class Meta:
         model = Bike
@@ -1,11 +1,18 @@
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.test import AsyncClient, override_settings
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.reverse import reverse
 
+from bikes.expiry import ReservationExpiryScheduler
 from bikes.models import Bike, BikeStatus, Reservation, Malfunction
 from core.testcases import APITestCase
 from stations.models import Station, StationStatus
-from users.models import User
+from users.models import User, UserRole
 
 
 class BikesGetTestCase(APITestCase):
@@ -64,6 +71,54 @@ class BikesGetTestCase(APITestCase):
         )
 
 
+class BikeListQueryCountTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            station = Station.objects.create(name=f"Station {i}")
+            Bike.objects.create(station=station)
+            Bike.objects.create(station=station, status=BikeStatus.blocked)
+            Bike.objects.create(station=station).rent(self.user)
+            Bike.objects.create(station=station).reserve(self.user)
+
+    def test_list_bikes_query_count(self):
+        # bikes with users, stations with available bike counts
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("bike-list"))
+        self.assertEqual(len(response.data["bikes"]), 20)
+
+    def test_list_rented_bikes_query_count(self):
+        # rented bikes have no station to fetch
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("bikes-rented-list"))
+        self.assertEqual(len(response.data["bikes"]), 5)
+
+    def test_list_reserved_bikes_query_count(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("bikes-reserved-list"))
+        self.assertEqual(len(response.data["bikes"]), 5)
+
+    def test_list_blocked_bikes_query_count(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("bikes-blocked-list"))
+        self.assertEqual(len(response.data["bikes"]), 5)
+
+    def test_list_bikes_at_station_query_count(self):
+        station = Station.objects.first()
+        for _ in range(4):
+            Bike.objects.create(station=station)
+        # station with available bike count, bikes with users
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse("station-bikes", kwargs={"pk": station.id})
+            )
+        self.assertEqual(len(response.data["bikes"]), 5)
+        self.assertEqual(
+            {bike["station"]["activeBikesCount"] for bike in response.data["bikes"]},
+            {5},
+        )
+
+
 class BikeCreateTestCase(APITestCase):
     def test_create_bike_status_code(self):
         station = Station.objects.create(name="Station Name")
@@ -283,6 +338,31 @@ class BikesRentTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(response.data, {"message": "User reached rental limit of 0."})
 
+    def test_rent_bike_query_count(self):
+        station = Station.objects.create(name="Station Name")
+        bike = Bike.objects.create(station=station)
+        # bike with station and reservation, then in a savepoint conditional update
+        # of the bike, station and user counters
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                reverse("bikes-rented-list"), {"id": f"{bike.id}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_rent_bike_changed_since_loaded(self):
+        station = Station.objects.create(name="Station Name")
+        bike = Bike.objects.create(station=station)
+        stale_bike = Bike.objects.get(id=bike.id)
+        other_user = User.objects.create(username="john-doe")
+        self.assertTrue(bike.rent(other_user))
+        self.assertFalse(stale_bike.rent(self.user))
+        bike.refresh_from_db()
+        self.assertEqual(bike.user, other_user)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.active_rentals, 0)
+        station.refresh_from_db()
+        self.assertEqual(station.bikes_total, 0)
+
 
 class BikesGetReservedTestCase(APITestCase):
     def test_get_reserved_bikes_status_code(self):
@@ -449,6 +529,20 @@ class BikeMakeReservationTestCase(APITestCase):
             response.data, {"message": "User already has max reservations."}
         )
 
+    def test_create_reservation_ignores_expired_reservations(self):
+        station = Station.objects.create(name="Station Name expired reservations")
+        for _ in range(3):
+            Bike.objects.create(station=station).reserve(self.user)
+        # expired, but not yet removed by the expiry worker
+        Reservation.objects.update(
+            reserved_till=timezone.now() - timezone.timedelta(minutes=1)
+        )
+        bike = Bike.objects.create(station=station)
+        response = self.client.get(reverse("bikes-reserved-list"))
+        self.assertEqual(response.data["bikes"], [])
+        response = self.client.post(reverse("bikes-reserved-list"), {"id": bike.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
 
 class BikeReservationDeleteTestCase(APITestCase):
     def test_delete_reservation_status_code(self):
@@ -544,21 +638,419 @@ class BikeReservationDeleteTestCase(APITestCase):
 
 
 class BikeReservationExpiresTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_user = User.objects.create(first_name="John", last_name="Doe")
+        self.station = Station.objects.create(name="Station Name reservation expires")
+
+    def reserve(self, reserved_till):
+        bike = Bike.objects.create(station=self.station, status=BikeStatus.reserved)
+        Reservation.objects.create(
+            bike=bike,
+            user=self.other_user,
+            reserved_at=timezone.now(),
+            reserved_till=reserved_till,
+        )
+        return bike
+
     def test_reservation_expires(self):
-        user = User.objects.create(first_name="John", last_name="Doe")
-        station = Station.objects.create(name="Station Name delete reservation body")
-        reserved_bike = Bike.objects.create(station=station, status=BikeStatus.reserved)
+        reserved_bike = self.reserve(timezone.now())
+        scheduler = ReservationExpiryScheduler()
+        scheduler.load()
+        self.assertEqual(scheduler.expire_due(), 1)
+        reserved_bike.refresh_from_db()
+        self.assertEqual(reserved_bike.status, BikeStatus.available)
+        self.assertFalse(Reservation.objects.filter(bike=reserved_bike).exists())
+
+    def test_reservation_not_expired_before_deadline(self):
+        reserved_bike = self.reserve(timezone.now() + timezone.timedelta(minutes=30))
+        scheduler = ReservationExpiryScheduler()
+        scheduler.load()
+        self.assertEqual(scheduler.expire_due(), 0)
+        reserved_bike.refresh_from_db()
+        self.assertEqual(reserved_bike.status, BikeStatus.reserved)
+
+    def test_reservations_expire_in_deadline_order(self):
+        time = timezone.now()
+        late_bike = self.reserve(time + timezone.timedelta(minutes=20))
+        early_bike = self.reserve(time + timezone.timedelta(minutes=10))
+        scheduler = ReservationExpiryScheduler()
+        scheduler.load()
+        self.assertEqual(scheduler.expire_due(time + timezone.timedelta(minutes=15)), 1)
+        early_bike.refresh_from_db()
+        late_bike.refresh_from_db()
+        self.assertEqual(early_bike.status, BikeStatus.available)
+        self.assertEqual(late_bike.status, BikeStatus.reserved)
+        self.assertEqual(len(scheduler), 1)
+
+    def test_cancelled_reservation_is_skipped(self):
+        reserved_bike = self.reserve(timezone.now())
+        scheduler = ReservationExpiryScheduler()
+        scheduler.load()
+        reserved_bike.cancel_reservation()
+        self.assertEqual(scheduler.expire_due(), 0)
+        self.assertEqual(len(scheduler), 0)
+
+    def test_load_picks_up_only_new_reservations(self):
+        self.reserve(timezone.now() + timezone.timedelta(minutes=30))
+        scheduler = ReservationExpiryScheduler()
+        self.assertEqual(scheduler.load(), 1)
+        self.reserve(timezone.now() + timezone.timedelta(minutes=30))
+        self.assertEqual(scheduler.load(), 1)
+        self.assertEqual(len(scheduler), 2)
+
+    def test_load_picks_up_reservations_committed_late(self):
         time = timezone.now()
+        self.reserve(time + timezone.timedelta(minutes=30))
+        scheduler = ReservationExpiryScheduler()
+        scheduler.load()
+        # reserved before the loaded one, but committed only after it was loaded
+        late_bike = Bike.objects.create(
+            station=self.station, status=BikeStatus.reserved
+        )
         Reservation.objects.create(
-            bike=reserved_bike,
-            user=user,
-            reserved_at=time,
+            bike=late_bike,
+            user=self.other_user,
+            reserved_at=time - timezone.timedelta(seconds=10),
             reserved_till=time,
         )
-        self.assertEqual(reserved_bike.status, BikeStatus.reserved)
+        self.assertEqual(scheduler.load(), 1)
+        self.assertEqual(scheduler.expire_due(), 1)
+        late_bike.refresh_from_db()
+        self.assertEqual(late_bike.status, BikeStatus.available)
+
+    def test_sleeps_until_earliest_deadline(self):
+        time = timezone.now()
+        self.reserve(time + timezone.timedelta(seconds=3))
+        scheduler = ReservationExpiryScheduler(poll_interval=60)
+        scheduler.load()
+        self.assertEqual(scheduler.seconds_until_next(time), 3)
+
+    def test_requests_do_not_expire_reservations(self):
+        reserved_bike = self.reserve(timezone.now())
         self.client.get(reverse("bike-list"))
         reserved_bike.refresh_from_db()
-        self.assertEqual(reserved_bike.status, BikeStatus.available)
+        self.assertEqual(reserved_bike.status, BikeStatus.reserved)
+
+
+class StationBikeCountersTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.station = Station.objects.create(name="Station Name counters")
+        self.bike = Bike.objects.create(station=self.station)
+
+    def assertCounters(self, station, total, available):
+        station.refresh_from_db()
+        self.assertEqual(
+            (station.bikes_total, station.bikes_available), (total, available)
+        )
+
+    def test_create_bike(self):
+        Bike.objects.create(station=self.station, status=BikeStatus.blocked)
+        self.assertCounters(self.station, 2, 1)
+
+    def test_rent_and_return_bike(self):
+        other_station = Station.objects.create(name="Station Name other")
+        self.bike.rent(self.user)
+        self.assertCounters(self.station, 0, 0)
+        self.bike.return_to_station(other_station)
+        self.assertCounters(self.station, 0, 0)
+        self.assertCounters(other_station, 1, 1)
+
+    def test_reserve_and_cancel_reservation(self):
+        self.bike.reserve(self.user)
+        self.assertCounters(self.station, 1, 0)
+        self.bike.cancel_reservation()
+        self.assertCounters(self.station, 1, 1)
+
+    def test_rent_reserved_bike(self):
+        self.bike.reserve(self.user)
+        self.bike.rent(self.user)
+        self.assertCounters(self.station, 0, 0)
+
+    def test_block_and_unblock(self):
+        self.bike.block()
+        self.assertCounters(self.station, 1, 0)
+        self.bike.unblock()
+        self.assertCounters(self.station, 1, 1)
+
+    def test_delete_bike(self):
+        self.bike.delete()
+        self.assertCounters(self.station, 0, 0)
+
+    def test_loaded_bike(self):
+        Bike.objects.get(id=self.bike.id).block()
+        self.assertCounters(self.station, 1, 0)
+
+    def test_stale_station_block(self):
+        stale = Station.objects.get(id=self.station.id)
+        self.bike.rent(self.user)
+        stale.block()
+        self.assertCounters(self.station, 0, 0)
+        stale.unblock()
+        self.assertCounters(self.station, 0, 0)
+
+    def test_stale_station_save(self):
+        stale = Station.objects.get(id=self.station.id)
+        self.bike.rent(self.user)
+        stale.name = "Station Name renamed"
+        stale.save()
+        self.assertCounters(self.station, 0, 0)
+        self.assertEqual(self.station.name, "Station Name renamed")
+
+
+class UserActivityCountersTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.station = Station.objects.create(name="Station Name counters")
+        self.bike = Bike.objects.create(station=self.station)
+
+    def assertCounters(self, rentals, reservations):
+        self.user.refresh_from_db()
+        self.assertEqual(
+            (self.user.active_rentals, self.user.active_reservations),
+            (rentals, reservations),
+        )
+
+    def test_rent_and_return_bike(self):
+        self.bike.rent(self.user)
+        self.assertCounters(1, 0)
+        self.bike.return_to_station(self.station)
+        self.assertCounters(0, 0)
+
+    def test_reserve_and_cancel_reservation(self):
+        self.bike.reserve(self.user)
+        self.assertCounters(0, 1)
+        self.bike.cancel_reservation()
+        self.assertCounters(0, 0)
+
+    def test_rent_reserved_bike(self):
+        self.bike.reserve(self.user)
+        self.bike.rent(self.user)
+        self.assertCounters(1, 0)
+
+    def test_stale_user_save(self):
+        stale = User.objects.get(id=self.user.id)
+        self.bike.rent(self.user)
+        stale.first_name = "Renamed"
+        stale.save()
+        self.assertCounters(1, 0)
+        self.assertTrue(self.bike.return_to_station(self.station))
+        self.assertCounters(0, 0)
+
+    def test_stale_user_block(self):
+        stale = User.objects.get(id=self.user.id)
+        self.bike.reserve(self.user)
+        stale.block()
+        self.assertCounters(0, 1)
+        stale.unblock()
+        self.assertCounters(0, 1)
+
+    def test_expire_overdue(self):
+        self.bike.reserve(self.user)
+        Bike.objects.create(station=self.station).reserve(self.user)
+        Reservation.objects.expire_overdue(
+            timezone.now() + timezone.timedelta(minutes=31)
+        )
+        self.assertCounters(0, 0)
+
+    def test_rent_bike_reserved_again_by_other_user(self):
+        other_user = User.objects.create(username="other", first_name="John")
+        self.bike.reserve(self.user)
+        stale = Bike.objects.select_related("reservation").get(id=self.bike.id)
+        self.bike.cancel_reservation()
+        self.bike.reserve(other_user)
+        self.assertFalse(stale.rent(self.user))
+        self.bike.refresh_from_db()
+        self.assertEqual(self.bike.status, BikeStatus.reserved)
+        self.assertEqual(self.bike.reservation.user, other_user)
+        self.assertCounters(0, 0)
+        other_user.refresh_from_db()
+        self.assertEqual(other_user.active_reservations, 1)
+
+    def test_cancel_expired_reservation(self):
+        self.bike.reserve(self.user)
+        other_bike = Bike.objects.create(station=self.station)
+        other_bike.reserve(self.user)
+        stale = Bike.objects.select_related("reservation").get(id=self.bike.id)
+        # expiry worker sweeps the reservation while the user cancels it
+        self.bike.reservation.delete()
+        Bike.objects.filter(id=self.bike.id).update(status=BikeStatus.available)
+        Station.objects.filter(id=self.station.id).update_bike_counts()
+        stale.cancel_reservation()
+        self.assertCounters(0, 1)
+        self.assertEqual(stale.status, BikeStatus.available)
+        self.station.refresh_from_db()
+        self.assertEqual(
+            (self.station.bikes_total, self.station.bikes_available), (2, 1)
+        )
+
+    def test_rent_limit_checked_against_counter(self):
+        self.user.rental_limit = 1
+        self.user.save()
+        self.bike.rent(self.user)
+        other_bike = Bike.objects.create(station=self.station)
+        response = self.client.post(
+            reverse("bikes-rented-list"), {"id": f"{other_bike.id}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ReconcileCountersTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.station = Station.objects.create(name="Station Name reconcile")
+        Bike.objects.create(station=self.station)
+        Bike.objects.create(station=self.station).rent(self.user)
+        Bike.objects.create(station=self.station).reserve(self.user)
+
+    def reconcile(self, *args):
+        out = StringIO()
+        call_command("reconcile_counters", *args, stdout=out)
+        return out.getvalue()
+
+    def test_no_mismatches(self):
+        self.assertIn("Found 0 stations and 0 users", self.reconcile())
+
+    def test_reports_mismatches_without_fixing(self):
+        Station.objects.filter(id=self.station.id).update(bikes_total=10)
+        User.objects.filter(id=self.user.id).update(active_reservations=0)
+        self.assertIn("Found 1 stations and 1 users", self.reconcile())
+        self.station.refresh_from_db()
+        self.assertEqual(self.station.bikes_total, 10)
+
+    def test_fixes_mismatches(self):
+        Station.objects.filter(id=self.station.id).update(
+            bikes_total=10, bikes_available=10
+        )
+        User.objects.filter(id=self.user.id).update(
+            active_rentals=0, active_reservations=0
+        )
+        self.reconcile("--fix", "--batch-size", "1")
+        self.station.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(
+            (self.station.bikes_total, self.station.bikes_available), (2, 1)
+        )
+        self.assertEqual(
+            (self.user.active_rentals, self.user.active_reservations), (1, 1)
+        )
+        self.assertIn("Found 0 stations and 0 users", self.reconcile())
+
+
+class BikeEffectiveStatusTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_user = User.objects.create(first_name="John", last_name="Doe")
+        self.station = Station.objects.create(name="Station Name effective status")
+        self.bike = Bike.objects.create(
+            station=self.station, status=BikeStatus.reserved
+        )
+        time = timezone.now()
+        Reservation.objects.create(
+            bike=self.bike,
+            user=self.other_user,
+            reserved_at=time - timezone.timedelta(minutes=31),
+            reserved_till=time - timezone.timedelta(minutes=1),
+        )
+
+    def test_expired_reservation_reads_as_available(self):
+        bike = Bike.objects.with_effective_status().get(id=self.bike.id)
+        self.assertEqual(bike.status, BikeStatus.reserved)
+        self.assertEqual(bike.effective_status, BikeStatus.available)
+
+    def test_active_reservation_reads_as_reserved(self):
+        Reservation.objects.filter(bike=self.bike).update(
+            reserved_till=timezone.now() + timezone.timedelta(minutes=30)
+        )
+        bike = Bike.objects.with_effective_status().get(id=self.bike.id)
+        self.assertEqual(bike.effective_status, BikeStatus.reserved)
+
+    def test_list_bikes_shows_expired_reservation_as_available(self):
+        response = self.client.get(reverse("bike-list"))
+        self.assertEqual(response.data["bikes"][0]["status"], BikeStatus.available)
+        self.assertEqual(response.data["bikes"][0]["station"]["activeBikesCount"], 1)
+
+    def test_stations_count_expired_reservation_as_available(self):
+        response = self.client.get(reverse("station-active"))
+        self.assertEqual(response.data["stations"][0]["activeBikesCount"], 1)
+        response = self.client.get(reverse("station-list"))
+        self.assertEqual(response.data["stations"][0]["activeBikesCount"], 1)
+        response = self.client.get(
+            reverse("station-detail", kwargs={"pk": self.station.id})
+        )
+        self.assertEqual(response.data["activeBikesCount"], 1)
+
+    def test_list_reserved_bikes_skips_expired_reservation(self):
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(reverse("bikes-reserved-list"))
+        self.assertDictEqual(response.data, {"bikes": []})
+
+    def test_reserve_bike_with_expired_reservation(self):
+        response = self.client.post(
+            reverse("bikes-reserved-list"), {"id": self.bike.id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Reservation.objects.get(bike=self.bike).user, self.user)
+
+    def test_rent_bike_with_expired_reservation(self):
+        response = self.client.post(
+            reverse("bikes-rented-list"), {"id": f"{self.bike.id}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Reservation.objects.filter(bike=self.bike).exists())
+
+
+class ReservationExpireOverdueTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.station = Station.objects.create(name="Station Name bulk expiry")
+
+    def reserve(self, reserved_till):
+        bike = Bike.objects.create(station=self.station, status=BikeStatus.reserved)
+        Reservation.objects.create(
+            bike=bike,
+            user=self.user,
+            reserved_at=timezone.now(),
+            reserved_till=reserved_till,
+        )
+        return bike
+
+    def test_expire_overdue_returns_expired_count(self):
+        time = timezone.now()
+        self.reserve(time - timezone.timedelta(minutes=1))
+        self.reserve(time - timezone.timedelta(minutes=2))
+        self.reserve(time + timezone.timedelta(minutes=30))
+        self.assertEqual(Reservation.objects.expire_overdue(time), 2)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_expire_overdue_makes_bikes_available(self):
+        time = timezone.now()
+        overdue_bike = self.reserve(time - timezone.timedelta(minutes=1))
+        reserved_bike = self.reserve(time + timezone.timedelta(minutes=30))
+        Reservation.objects.expire_overdue(time)
+        overdue_bike.refresh_from_db()
+        reserved_bike.refresh_from_db()
+        self.assertEqual(overdue_bike.status, BikeStatus.available)
+        self.assertEqual(reserved_bike.status, BikeStatus.reserved)
+
+    def test_expire_overdue_updates_station_counters(self):
+        time = timezone.now()
+        self.reserve(time - timezone.timedelta(minutes=1))
+        self.reserve(time + timezone.timedelta(minutes=30))
+        Reservation.objects.expire_overdue(time)
+        self.station.refresh_from_db()
+        self.assertEqual(self.station.bikes_total, 2)
+        self.assertEqual(self.station.bikes_available, 1)
+
+    def test_expire_overdue_query_count_does_not_depend_on_reservations(self):
+        time = timezone.now()
+        for _ in range(20):
+            self.reserve(time - timezone.timedelta(minutes=1))
+        # savepoint, update of bikes, update of station and user counters,
+        # delete of reservations, savepoint release
+        with self.assertNumQueries(6):
+            self.assertEqual(Reservation.objects.expire_overdue(time), 20)
 
 
 class BikeListBlockedTestCase(APITestCase):
@@ -844,3 +1336,54 @@ class MalfunctionDestroyTestCase(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertDictEqual(response.data, {"message": "Malfunction does not exist."})
+
+
+@override_settings(ROOT_URLCONF="salty_bikes.asgi_urls")
+class BikeAsyncViewsTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+        # AsyncClient sends extra arguments as raw headers
+        self.auth = {"Authorization": f"Bearer {self.token.key}"}
+        self.station = Station.objects.create(name="Station")
+
+    async def test_rented_bikes(self):
+        bike = await sync_to_async(Bike.objects.create)(
+            user=self.user, status=BikeStatus.rented
+        )
+        response = await self.async_client.get("/bikes/rented", **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [bike["id"] for bike in response.json()["bikes"]], [str(bike.id)]
+        )
+
+    async def test_rented_bikes_unauthenticated(self):
+        response = await self.async_client.get("/bikes/rented")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_rent_is_served_by_sync_view(self):
+        self.user.role = UserRole.user
+        await sync_to_async(self.user.save)()
+        bike = await sync_to_async(Bike.objects.create)(station=self.station)
+        response = await self.async_client.post(
+            "/bikes/rented",
+            {"id": str(bike.id)},
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_reserved_bikes(self):
+        bike = Bike.objects.create(station=self.station)
+        bike.reserve(self.user)
+        response = self.client.get("/bikes/reserved")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [bike["id"] for bike in response.json()["bikes"]], [str(bike.id)]
+        )
+
+    def test_same_response_as_sync_view(self):
+        Bike.objects.create(station=self.station).reserve(self.user)
+        with override_settings(ROOT_URLCONF=settings.BASE_URLCONF):
+            expected = self.client.get(reverse("bikes-reserved-list")).json()
+        self.assertEqual(self.client.get("/bikes/reserved").json(), expected)
@@ -15,14 +15,17 @@ from bikes.serializers import (
     MalfunctionSerializer,
     CreateMalfunctionSerializer,
 )
+from core.async_views import async_read_view
 from core.constants import BIKE_RESERVATION_LIMIT
 from core.decorators import restrict
 from core.serializers import MessageSerializer, IdSerializer
+from core.views import ReplicaReadsMixin
 from stations.models import StationStatus
 from users.models import UserRole, UserState
 
 
 class BikeViewSet(
+    ReplicaReadsMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -32,6 +35,9 @@ class BikeViewSet(
     response_serializer = ReadBikeSerializer
     message_serializer = MessageSerializer
 
+    def get_queryset(self):
+        return super().get_queryset().with_effective_status().with_related()
+
     def get_serializer_class(self):
         if self.action == "create":
             return CreateBikeSerializer
@@ -54,7 +60,7 @@ class BikeViewSet(
                 status=status.HTTP_400_BAD_REQUEST,
             )
         station = serializer.validated_data["station"]
-        if station.bikes.count() >= station.bikesLimit:
+        if station.bikes_total >= station.bikesLimit:
             return Response(
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 data={
@@ -91,13 +97,15 @@ class BikeViewSet(
         return super().destroy(request, *args, **kwargs)
 
 
-class BikesRentedViewSet(CreateModelMixin, ListModelMixin, viewsets.GenericViewSet):
+class BikesRentedViewSet(
+    ReplicaReadsMixin, CreateModelMixin, ListModelMixin, viewsets.GenericViewSet
+):
     request_serializer = RentBikeSerializer
     response_serializer = ReadBikeSerializer
     message_serializer = MessageSerializer
 
     def get_queryset(self):
-        return Bike.objects.filter(status=BikeStatus.rented, user=self.request.user)
+        return Bike.objects.rented_by(self.request.user).with_related()
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -135,20 +143,44 @@ class BikesRentedViewSet(CreateModelMixin, ListModelMixin, viewsets.GenericViewS
                 {"message": "Blocked users are not allowed to rent bikes."},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        if request.user.bikes.count() >= request.user.rental_limit:
+        if request.user.active_rentals >= request.user.rental_limit:
             return Response(
                 {
                     "message": f"User reached rental limit of {request.user.rental_limit}."
                 },
                 status=status.HTTP_403_FORBIDDEN,
             )
-        try:
-            bike = Bike.objects.get(id=request.data.get("id"))
-        except Bike.DoesNotExist:
+        bikes = Bike.objects.select_related("station", "reservation")
+        bike = bikes.filter(id=request.data.get("id")).first()
+        if bike is None:
             return Response(
                 {"message": "Bike not found."}, status=status.HTTP_404_NOT_FOUND
             )
-        if bike.station.status == StationStatus.blocked:
+        # expiry worker might not have caught up with this reservation yet
+        bike.check_reservation()
+        error_response = self.rent_error_response(bike, request.user)
+        if error_response:
+            return error_response
+
+        if not bike.rent(request.user):
+            # bike changed since we loaded it, report what stops the rent now
+            bike = bikes.filter(id=bike.id).first()
+            if bike is None:
+                return Response(
+                    {"message": "Bike not found."}, status=status.HTTP_404_NOT_FOUND
+                )
+            return self.rent_error_response(bike, request.user) or Response(
+                {"message": "Bike is no longer available."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(
+            data=ReadBikeSerializer(bike).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @staticmethod
+    def rent_error_response(bike, user):
+        if bike.station is not None and bike.station.status == StationStatus.blocked:
             return Response(
                 {"message": "Cannot rent a bike from blocked station."},
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -163,27 +195,20 @@ class BikesRentedViewSet(CreateModelMixin, ListModelMixin, viewsets.GenericViewS
                 {"message": "Bike is currently reserved."},
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
-        if bike.status == BikeStatus.reserved and bike.reservation.user != request.user:
+        if bike.status == BikeStatus.reserved and bike.reservation.user_id != user.id:
             return Response(
                 {"message": "Bike is currently reserved by different user."},
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
-
-        bike.rent(self.request.user)
-        return Response(
-            data=ReadBikeSerializer(bike).data,
-            status=status.HTTP_201_CREATED,
-        )
+        return None
 
     @restrict(UserRole.user, UserRole.tech, UserRole.admin)
     def list(self, request, *args, **kwargs):
-        return Response(
-            status=status.HTTP_200_OK,
-            data={"bikes": ReadBikeSerializer(self.get_queryset(), many=True).data},
-        )
+        return rented_bikes_response(self.get_queryset())
 
 
 class BikesReservedViewSet(
+    ReplicaReadsMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
     GenericViewSet,
@@ -192,7 +217,10 @@ class BikesReservedViewSet(
     message_serializer = MessageSerializer
 
     def get_queryset(self):
-        return Bike.objects.filter(reservation__user=self.request.user)
+        if getattr(self, "swagger_fake_view", False):
+            # schema generation, without any user
+            return Bike.objects.none()
+        return Bike.objects.reserved_by(self.request.user).with_related()
 
     @swagger_auto_schema(
         responses={
@@ -227,6 +255,8 @@ class BikesReservedViewSet(
             return Response(
                 {"message": "Bike not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        # expiry worker might not have caught up with this reservation yet
+        bike.check_reservation()
         if bike.status != BikeStatus.available:
             return Response(
                 {"message": "Bike already blocked, rented or reserved."},
@@ -237,8 +267,11 @@ class BikesReservedViewSet(
                 {"message": "Station is blocked."},
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
+        # the counter still includes expired reservations the expiry worker did not
+        # remove yet, which do not count towards the limit
         if (
-            Reservation.objects.filter(user=request.user).count()
+            request.user.active_reservations >= BIKE_RESERVATION_LIMIT
+            and Reservation.objects.active().filter(user=request.user).count()
             >= BIKE_RESERVATION_LIMIT
         ):
             return Response(
@@ -254,10 +287,7 @@ class BikesReservedViewSet(
 
     @restrict(UserRole.user, UserRole.tech, UserRole.admin)
     def list(self, request, *args, **kwargs):
-        return Response(
-            status=status.HTTP_200_OK,
-            data={"bikes": ReserveBikeSerializer(self.get_queryset(), many=True).data},
-        )
+        return reserved_bikes_response(self.get_queryset())
 
     @swagger_auto_schema(
         responses={
@@ -302,6 +332,7 @@ class BikesReservedViewSet(
 
 
 class BikesBlockedViewSet(
+    ReplicaReadsMixin,
     CreateModelMixin,
     ListModelMixin,
     DestroyModelMixin,
@@ -312,6 +343,9 @@ class BikesBlockedViewSet(
     request_serializer = IdSerializer
     message_serializer = MessageSerializer
 
+    def get_queryset(self):
+        return super().get_queryset().with_related()
+
     @swagger_auto_schema(
         request_body=request_serializer,
         responses={
@@ -395,6 +429,7 @@ class BikesBlockedViewSet(
 
 
 class MalfunctionViewSet(
+    ReplicaReadsMixin,
     CreateModelMixin,
     ListModelMixin,
     DestroyModelMixin,
@@ -481,3 +516,42 @@ class MalfunctionViewSet(
 
         malfunction.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def rented_bikes_response(bikes) -> Response:
+    return Response(
+        status=status.HTTP_200_OK,
+        data={"bikes": ReadBikeSerializer(bikes, many=True).data},
+    )
+
+
+def reserved_bikes_response(bikes) -> Response:
+    return Response(
+        status=status.HTTP_200_OK,
+        data={"bikes": ReserveBikeSerializer(bikes, many=True).data},
+    )
+
+
+# async versions of hot read endpoints, served by the ASGI entry point
+
+
+@async_read_view(
+    UserRole.user,
+    UserRole.tech,
+    UserRole.admin,
+    fallback=BikesRentedViewSet.as_view({"get": "list", "post": "create"}),
+)
+def rented_bikes(request):
+    return rented_bikes_response(Bike.objects.rented_by(request.user).with_related())
+
+
+@async_read_view(
+    UserRole.user,
+    UserRole.tech,
+    UserRole.admin,
+    fallback=BikesReservedViewSet.as_view({"get": "list", "post": "create"}),
+)
+def reserved_bikes(request):
+    return reserved_bikes_response(
+        Bike.objects.reserved_by(request.user).with_related()
+    )
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.core import checks
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    name = "core"
+
+    def ready(self):
+        from core.cache import check_shared_cache
+        from core.db import check_connections, configure_sqlite, release_connections
+
+        connection_created.connect(configure_sqlite)
+        request_started.connect(check_connections)
+        request_finished.connect(release_connections)
+        checks.register(check_shared_cache, checks.Tags.caches)
@@ -0,0 +1,117 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.db import is_stuck_to_primary, read_only
+
+
+def async_read_view(*roles, fallback):
+    """
+    Turns a function loading response data into an async view for GET requests,
+    served from the ASGI entry point.
+
+    Django ORM is synchronous, so authentication and the function itself run together
+    in a single worker thread, while waiting for slow clients takes no thread at all.
+
+    :param roles: list of UserRoles that should be allowed access, like `restrict`
+    :param fallback: sync view serving other methods of the same URL
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def view(request, *args, **kwargs):
+            if request.method != "GET":
+                return await sync_to_async(fallback)(request, *args, **kwargs)
+            return with_renderer(await sync_to_async(handle)(request, *args, **kwargs))
+
+        def handle(request, *args, **kwargs):
+            request = Request(
+                request,
+                authenticators=[
+                    auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+                ],
+            )
+            try:
+                user = request.user
+            except APIException as exc:
+                return unauthenticated_response(exc.detail)
+            if not user.is_authenticated:
+                return unauthenticated_response(
+                    "Authentication credentials were not provided."
+                )
+            if user.role not in roles:
+                return Response(
+                    status=status.HTTP_403_FORBIDDEN,
+                    data={"message": "Unauthorized."},
+                )
+            if settings.REPLICA_DATABASE and not is_stuck_to_primary(user.id):
+                with read_only():
+                    return func(request, *args, **kwargs)
+            return func(request, *args, **kwargs)
+
+        # as DRF views, which enforce CSRF only for session logins; not csrf_exempt
+        # decorator, which turns coroutine functions into sync ones in Django 3.2
+        view.csrf_exempt = True
+        return view
+
+    return decorator
+
+
+def async_post_view(fallback):
+    """
+    Turns a coroutine function into an async view for POST requests of anonymous
+    clients, like login and register, served from the ASGI entry point.
+
+    The function gets the request with its body parsed, and runs on the event loop, so
+    it only holds a worker thread while it waits for what it passes to sync_to_async.
+
+    :param fallback: sync view serving other methods of the same URL
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def view(request, *args, **kwargs):
+            if request.method != "POST":
+                return await sync_to_async(fallback)(request, *args, **kwargs)
+            request = Request(
+                request,
+                parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+                authenticators=[],
+            )
+            try:
+                request.data
+            except APIException as exc:
+                return with_renderer(
+                    Response(status=exc.status_code, data={"detail": exc.detail})
+                )
+            return with_renderer(await func(request, *args, **kwargs))
+
+        view.csrf_exempt = True
+        return view
+
+    return decorator
+
+
+def with_renderer(response: Response) -> Response:
+    """
+    Set up DRF response returned outside of an APIView to be rendered as JSON.
+    """
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = JSONRenderer.media_type
+    response.renderer_context = {}
+    return response
+
+
+def unauthenticated_response(detail) -> Response:
+    return Response(
+        status=status.HTTP_401_UNAUTHORIZED,
+        data={"detail": detail},
+        headers={"WWW-Authenticate": "Bearer"},
+    )
@@ -1,5 +1,85 @@
+from django.conf import settings
+from django.core import signing
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.cache import token_cache
+from core.tokens import SignedToken, is_due_for_rotation, is_expired
+from users.models import User
+
+
+def build_user(values: dict) -> User:
+    """
+    Build user from a subset of its fields, the rest is loaded lazily on first access.
+    """
+    # from_db expects values in the order of model fields
+    field_names = [
+        field.attname for field in User._meta.concrete_fields if field.attname in values
+    ]
+    return User.from_db(None, field_names, [values[name] for name in field_names])
+
+
+def issue_token(user) -> str:
+    """
+    Issue a bearer token for user, signed one if SIGNED_TOKENS setting is enabled.
+    """
+    if settings.SIGNED_TOKENS:
+        return SignedToken.issue(user).key
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and is_due_for_rotation(token):
+        # key is the primary key, so the token is replaced instead of refreshed
+        token.delete()
+        token_cache.invalidate(token.key)
+        token = Token.objects.create(user=user)
+    return token.key
 
 
 class BearerTokenAuthentication(TokenAuthentication):
     keyword = "Bearer"
+
+    # user fields kept in token cache, the rest is loaded lazily on first access
+    cached_fields = ("id", "username", "role", "state", "rental_limit", "is_active")
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            values = {field: getattr(user, field) for field in self.cached_fields}
+            token_cache.set(key, (token.created, values), group=user.id)
+        else:
+            created, values = entry
+            # fresh instance for each request, so lazily loaded fields are never stale
+            user = build_user(values)
+            token = Token(key=key, user=user, created=created)
+        if is_expired(token):
+            raise AuthenticationFailed("Token has expired.")
+        return user, token
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Authenticates stateless signed bearer tokens without any database access.
+
+    Tokens of other kinds are left for the following authentication classes.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate_credentials(self, key):
+        # database tokens are plain hex strings, signed ones have separated parts
+        if signing.Signer().sep not in key:
+            return None
+        try:
+            token = SignedToken.verify(key)
+        except signing.BadSignature:
+            raise AuthenticationFailed("Invalid token.")
+        user = build_user(
+            {
+                "id": token.claims["id"],
+                "role": token.claims["role"],
+                "state": token.claims["state"],
+                "is_active": True,
+            }
+        )
+        return user, token
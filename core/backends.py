@@ -0,0 +1,114 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
+
+from core.hashing import PoolSaturated, hashing_pool
+
+
+async def aauthenticate(request=None, **credentials):
+    """
+    Async counterpart of django.contrib.auth.authenticate, going through the same
+    AUTHENTICATION_BACKENDS: those with `aauthenticate` are awaited, the rest run in
+    a worker thread.
+    """
+    for backend, backend_path in auth._get_backends(return_tuples=True):
+        try:
+            inspect.signature(backend.authenticate).bind(request, **credentials)
+        except TypeError:
+            # this backend doesn't accept these credentials as arguments
+            continue
+        try:
+            if hasattr(backend, "aauthenticate"):
+                user = await backend.aauthenticate(request, **credentials)
+            else:
+                user = await sync_to_async(backend.authenticate)(request, **credentials)
+        except PermissionDenied:
+            break
+        if user is None:
+            continue
+        user.backend = backend_path
+        return user
+    await sync_to_async(user_login_failed.send)(
+        sender=auth.__name__,
+        credentials=auth._clean_credentials(credentials),
+        request=request,
+    )
+
+
+class HashingPoolBackend(ModelBackend):
+    """
+    ModelBackend checking passwords in the hashing pool instead of the request thread.
+
+    authenticate raises PoolSaturated when the pool is full, which login answers
+    with 503. aauthenticate awaits the pool, so async login holds no thread meanwhile.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            # hash anyway, so response time does not tell which usernames exist
+            hashing_pool.make_password(password)
+            return None
+        if hashing_pool.check_password(
+            password, user.password, setter=lambda raw: self.upgrade_password(user, raw)
+        ) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await sync_to_async(user_model._default_manager.get_by_natural_key)(
+                username
+            )
+        except user_model.DoesNotExist:
+            await hashing_pool.amake_password(password)
+            return None
+        if await hashing_pool.acheck_password(
+            password,
+            user.password,
+            setter=lambda raw: self.aupgrade_password(user, raw),
+        ) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    @classmethod
+    def upgrade_password(cls, user, password: str):
+        """
+        Rehash password whose hash uses outdated hasher or iterations, as
+        AbstractBaseUser.check_password does.
+        """
+        try:
+            user.password = hashing_pool.make_password(password)
+        except PoolSaturated:
+            # the next login upgrades it
+            return
+        cls.store_password(user)
+
+    @classmethod
+    async def aupgrade_password(cls, user, password: str):
+        try:
+            user.password = await hashing_pool.amake_password(password)
+        except PoolSaturated:
+            return
+        await sync_to_async(cls.store_password)(user)
+
+    @staticmethod
+    def store_password(user):
+        # not User.save, the same password must not log the user out everywhere
+        type(user)._default_manager.filter(pk=user.pk).update(password=user.password)
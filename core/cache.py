@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import SimpleLazyObject
+
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "dummy": "django.core.cache.backends.dummy.DummyCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "db": "django.core.cache.backends.db.DatabaseCache",
+    "memcached": "django.core.cache.backends.memcached.PyMemcacheCache",
+}
+# keep entries in memory of each process, so processes do not see each other's writes
+PROCESS_LOCAL_CACHE_BACKENDS = (CACHE_BACKENDS["locmem"], CACHE_BACKENDS["dummy"])
+
+
+class TTLCache:
+    """
+    Thread safe in-process cache, that forgets entries after `timeout` seconds and evicts
+    least recently used ones once it holds more than `max_size` entries.
+
+    Every entry belongs to a group (e.g. user id), so all entries of a group can be
+    invalidated at once.
+    """
+
+    def __init__(self, timeout: float, max_size: int):
+        self.timeout = timeout
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, group=None):
+        if self.timeout <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, group, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_group(self, group):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[1] == group]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def parse_cache_url(url: str) -> dict:
+    """
+    Turn cache URL into Django cache settings, e.g. `locmem://`,
+    `db://django_cache` (table created by `createcachetable`),
+    `file:///var/tmp/salty_bikes` or `memcached://host1:11211,host2:11211`.
+
+    :raises ImproperlyConfigured: if the URL scheme is not supported
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in CACHE_BACKENDS:
+        raise ImproperlyConfigured(f"Unsupported cache URL scheme {parsed.scheme!r}.")
+    if parsed.scheme == "file":
+        location = unquote(parsed.path)
+    elif parsed.scheme == "memcached":
+        location = parsed.netloc.split(",")
+    else:
+        location = unquote(parsed.netloc)
+    return {"BACKEND": CACHE_BACKENDS[parsed.scheme], "LOCATION": location}
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """
+    System check refusing features which keep state in Django cache, when each process
+    has a cache of its own.
+    """
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHE_BACKENDS:
+        return []
+    errors = []
+    if settings.SIGNED_TOKENS:
+        errors.append(
+            checks.Error(
+                "SIGNED_TOKENS require a cache shared by all processes.",
+                hint="Logged out tokens would keep working in other processes, "
+                "set CACHE_URL, e.g. to memcached://127.0.0.1:11211.",
+                id="core.E001",
+            )
+        )
+    if settings.REPLICA_DATABASE:
+        errors.append(
+            checks.Error(
+                "DATABASE_REPLICA_URL requires a cache shared by all processes.",
+                hint="Users would not see their own writes when their next request "
+                "lands on another process, set CACHE_URL, e.g. to memcached://127.0.0.1:11211.",
+                id="core.E002",
+            )
+        )
+    return errors
+
+
+# token key -> snapshot of user fields needed to authenticate and authorize requests,
+# created on first use, as settings import parse_cache_url from this module
+token_cache = SimpleLazyObject(
+    lambda: TTLCache(
+        timeout=settings.TOKEN_CACHE_TIMEOUT, max_size=settings.TOKEN_CACHE_SIZE
+    )
+)
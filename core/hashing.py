@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+class PoolSaturated(Exception):
+    """
+    Raised when the pool already has as many tasks as it is allowed to queue.
+    """
+
+
+class HashingPool:
+    """
+    Bounded pool running password hashing off the request thread.
+
+    Hashing in CPython's hashlib releases the GIL, so `workers` threads hash on as many
+    cores in parallel. At most `max_queued` tasks wait for a free worker, further ones
+    are rejected right away instead of piling up behind a login storm.
+
+    Sync callers wait for the hash in their own thread, async ones await it without
+    holding any thread.
+    """
+
+    def __init__(self, workers: int, max_queued: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="hashing"
+        )
+        self._slots = threading.BoundedSemaphore(workers + max_queued)
+
+    def run(self, func, *args):
+        """
+        Run func in the pool and wait for its result.
+
+        :raises PoolSaturated: if the pool is full
+        """
+        return self._submit(func, *args).result()
+
+    async def arun(self, func, *args):
+        """
+        Run func in the pool and await its result.
+
+        :raises PoolSaturated: if the pool is full
+        """
+        return await asyncio.wrap_future(self._submit(func, *args))
+
+    def _submit(self, func, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturated()
+        try:
+            return self._executor.submit(self._run_task, func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _run_task(self, func, *args):
+        # slot is freed before the result is handed over, so it is available for
+        # the next task of the same caller
+        try:
+            return func(*args)
+        finally:
+            self._slots.release()
+
+    def check_password(self, password: str, encoded: str, setter=None) -> bool:
+        """
+        :param setter: called on the calling thread with the password, if it is correct
+            but its hash is outdated
+        """
+        outdated = []
+        correct = self.run(check_password, password, encoded, outdated.append)
+        if correct and outdated and setter:
+            setter(password)
+        return correct
+
+    def make_password(self, password: str) -> str:
+        return self.run(make_password, password)
+
+    async def acheck_password(self, password: str, encoded: str, setter=None) -> bool:
+        """
+        :param setter: coroutine function awaited with the password, if it is correct
+            but its hash is outdated
+        """
+        outdated = []
+        correct = await self.arun(check_password, password, encoded, outdated.append)
+        if correct and outdated and setter:
+            await setter(password)
+        return correct
+
+    async def amake_password(self, password: str) -> str:
+        return await self.arun(make_password, password)
+
+
+hashing_pool = HashingPool(
+    workers=settings.PASSWORD_HASHING_WORKERS,
+    max_queued=settings.PASSWORD_HASHING_QUEUE,
+)
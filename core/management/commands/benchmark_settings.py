@@ -0,0 +1,95 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+# runs in a fresh interpreter, so nothing is imported yet
+SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+
+get_wsgi_application()
+get_resolver().url_patterns  # imports all views
+startup = time.perf_counter() - start
+
+from django.test import Client
+
+client = Client(HTTP_HOST="localhost")
+headers = {"HTTP_AUTHORIZATION": f"Bearer {sys.argv[3]}"} if sys.argv[3] else {}
+latencies = []
+for _ in range(int(sys.argv[2])):
+    start = time.perf_counter()
+    client.get(sys.argv[1], **headers)
+    latencies.append(time.perf_counter() - start)
+print(json.dumps({"startup": startup, "latencies": latencies}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare cold start and per-request overhead of settings modules, each "
+        "measured in fresh processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "modules",
+            nargs="*",
+            metavar="settings",
+            default=["salty_bikes.settings", "salty_bikes.settings_api"],
+            help="Settings modules to compare.",
+        )
+        parser.add_argument(
+            "--path",
+            default="/stations/active",
+            help="Path requested, without token the request stops at authentication.",
+        )
+        parser.add_argument("--token", default="", help="Bearer token sent.")
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            help="Number of requests in each process.",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=5,
+            help="Number of processes started for each settings module.",
+        )
+
+    def handle(self, *args, **options):
+        for settings_module in options["modules"]:
+            startups, latencies = [], []
+            for _ in range(options["runs"]):
+                result = self.run(settings_module, options)
+                startups.append(result["startup"])
+                latencies.extend(result["latencies"])
+            self.stdout.write(
+                f"{settings_module}: cold start {statistics.median(startups) * 1000:.0f} ms, "
+                f"request p50 {statistics.median(latencies) * 1000:.2f} ms"
+            )
+
+    @staticmethod
+    def run(settings_module, options):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                SCRIPT,
+                options["path"],
+                str(options["requests"]),
+                options["token"],
+            ],
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": settings_module},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        return json.loads(output.splitlines()[-1])
@@ -0,0 +1,107 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of concurrent reads and writes on SQLite with its default "
+        "configuration and with SQLITE_PRAGMAS setting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=16,
+            help="Number of concurrent connections.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=5.0,
+            help="Number of seconds each configuration runs.",
+        )
+        parser.add_argument(
+            "--write-ratio",
+            type=float,
+            default=0.2,
+            help="Fraction of operations that are writes, like rents and returns.",
+        )
+
+    def handle(self, *args, **options):
+        for name, pragmas in (
+            ("default", {}),
+            ("SQLITE_PRAGMAS", settings.SQLITE_PRAGMAS),
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "benchmark.sqlite3")
+                ops, errors = self.run(path, pragmas, options)
+            self.stdout.write(
+                f"{name}: {ops / options['duration']:.0f} ops/s, "
+                f"{errors} failed with database is locked"
+            )
+
+    def run(self, path, pragmas, options):
+        connection = self.connect(path, pragmas)
+        connection.execute(
+            "CREATE TABLE bike (id INTEGER PRIMARY KEY, station INTEGER, status TEXT)"
+        )
+        connection.executemany(
+            "INSERT INTO bike (station, status) VALUES (?, 'available')",
+            [(i % 100,) for i in range(10000)],
+        )
+        connection.commit()
+        connection.close()
+
+        counts = []
+        deadline = time.monotonic() + options["duration"]
+
+        def worker():
+            # same locking as Django, which leaves transactions to sqlite3 module
+            connection = self.connect(path, pragmas)
+            ops = errors = 0
+            while time.monotonic() < deadline:
+                try:
+                    if random.random() < options["write_ratio"]:
+                        connection.execute(
+                            "UPDATE bike SET status = ? WHERE id = ?",
+                            (
+                                random.choice(("available", "rented")),
+                                random.randint(1, 10000),
+                            ),
+                        )
+                        connection.commit()
+                    else:
+                        connection.execute(
+                            "SELECT COUNT(*) FROM bike WHERE station = ? AND status = 'available'",
+                            (random.randint(0, 99),),
+                        ).fetchone()
+                    ops += 1
+                except sqlite3.OperationalError:
+                    connection.rollback()
+                    errors += 1
+            connection.close()
+            counts.append((ops, errors))
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(ops for ops, _ in counts), sum(errors for _, errors in counts)
+
+    @staticmethod
+    def connect(path, pragmas):
+        # Django's default timeout of sqlite3 module, busy_timeout pragma overrides it
+        connection = sqlite3.connect(path, check_same_thread=False)
+        apply_pragmas(connection.cursor(), pragmas)
+        return connection
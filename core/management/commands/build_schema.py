@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+
+from core.schema import schema_path
+
+CODECS = {".json": OpenAPICodecJson, ".yaml": OpenAPICodecYaml}
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the OpenAPI schema to files served by /swagger.json and "
+        "/swagger.yaml, run it on each deploy."
+    )
+
+    def handle(self, *args, **options):
+        generator = swagger_settings.DEFAULT_GENERATOR_CLASS(
+            info=swagger_settings.DEFAULT_INFO
+        )
+        schema = generator.get_schema(request=None, public=True)
+        os.makedirs(settings.OPENAPI_SCHEMA_DIR, exist_ok=True)
+        for format, codec in CODECS.items():
+            path = schema_path(format)
+            # replaced at once, processes starting meanwhile never read half of it
+            with tempfile.NamedTemporaryFile(
+                dir=settings.OPENAPI_SCHEMA_DIR, delete=False
+            ) as file:
+                file.write(codec(validators=[]).encode(schema))
+            os.replace(file.name, path)
+            self.stdout.write(f"Wrote {path}")
@@ -0,0 +1,86 @@
+import http.client
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Send GET requests to a running server from concurrent keep-alive "
+        "connections and report requests/s and latencies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="e.g. http://127.0.0.1:8080/stations/active")
+        parser.add_argument("--token", help="Bearer token sent with requests.")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=32,
+            help="Number of concurrent connections.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=10.0,
+            help="Number of seconds to send requests for.",
+        )
+
+    def handle(self, *args, **options):
+        url = urlparse(options["url"])
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Bearer {options['token']}"
+        connection_class = (
+            http.client.HTTPSConnection
+            if url.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        statuses = Counter()
+        latencies = []
+        lock = threading.Lock()
+        deadline = time.monotonic() + options["duration"]
+
+        def client():
+            connection = connection_class(url.netloc, timeout=30)
+            own_statuses, own_latencies = Counter(), []
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    connection.request("GET", url.path or "/", headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    own_statuses[response.status] += 1
+                except (OSError, http.client.HTTPException):
+                    own_statuses["error"] += 1
+                    connection.close()
+                    continue
+                own_latencies.append(time.perf_counter() - start)
+            connection.close()
+            with lock:
+                statuses.update(own_statuses)
+                latencies.extend(own_latencies)
+
+        threads = [
+            threading.Thread(target=client) for _ in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        latencies.sort()
+        total = sum(statuses.values())
+        self.stdout.write(f"{total / options['duration']:.1f} requests/s")
+        if latencies:
+            self.stdout.write(
+                f"latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+                f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms"
+            )
+        self.stdout.write(
+            "responses: "
+            + ", ".join(f"{status}: {count}" for status, count in statuses.items())
+        )
@@ -0,0 +1,25 @@
+from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field: str):
+    """
+    Correlated subquery counting rows of queryset which point at the outer row, usable
+    in annotations and UPDATEs of many rows at once.
+
+    :param queryset: rows to count, like `Bike.objects.filter(status=...)`
+    :param field: lookup from queryset rows to the outer row, like "station"
+    :return: expression evaluating to the count, 0 when nothing points at the row
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count"),
+            output_field=models.IntegerField(),
+        ),
+        0,
+    )
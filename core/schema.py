@@ -0,0 +1,61 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+CONTENT_TYPES = {".json": "application/json", ".yaml": "application/yaml"}
+
+# content and ETag of prebuilt schema documents read by this process, by path
+_documents = {}
+
+
+def schema_path(format) -> str:
+    """
+    :param format: ".json" or ".yaml"
+    :return: path of the schema document written by `build_schema`
+    """
+    return os.path.join(settings.OPENAPI_SCHEMA_DIR, f"swagger{format}")
+
+
+def load_schema(format):
+    """
+    Reads a prebuilt schema document once per process, it changes only on deploy.
+
+    :param format: ".json" or ".yaml"
+    :return: content and ETag of the document, None if it has not been built
+    """
+    path = schema_path(format)
+    if path not in _documents:
+        try:
+            with open(path, "rb") as file:
+                content = file.read()
+        except FileNotFoundError:
+            return None
+        _documents[path] = content, f'"{hashlib.sha256(content).hexdigest()}"'
+    return _documents[path]
+
+
+def prebuilt_schema_view(fallback):
+    """
+    Serves the OpenAPI schema rendered by `build_schema` from memory, so polling it
+    does not introspect every view and serializer. Clients revalidate their copy with
+    If-None-Match and get 304 until the next deploy.
+
+    :param fallback: view generating the schema, used until it has been built
+    """
+
+    @require_safe
+    def view(request, format):
+        document = load_schema(format)
+        if document is None:
+            return fallback(request, format=format)
+        content, etag = document
+        response = HttpResponse(content, content_type=CONTENT_TYPES[format])
+        response["ETag"] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return get_conditional_response(request, etag=etag, response=response)
+
+    return view
@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework.authtoken.models import Token
 
 from rest_framework.test import APIClient
@@ -6,6 +6,9 @@ from rest_framework.test import APIClient
 from users.models import User, UserRole
 
 
+# test client's logout stores a session, this one needs no database table, so it works
+# with the API-only settings too, which leave the sessions app out
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
 class APITestCase(TestCase):
     def setUp(self):
         super().setUp()
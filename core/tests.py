@@ -0,0 +1,446 @@
+import io
+import re
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from core.cache import check_shared_cache, parse_cache_url
+from core.db import (
+    ReplicaRouter,
+    check_connections,
+    configure_sqlite,
+    parse_database_url,
+    read_only,
+    read_only_marker,
+    release_connections,
+)
+from bikes.models import Bike, BikeStatus, Reservation
+from bikes.views import BikesBlockedViewSet, BikesRentedViewSet, BikesReservedViewSet
+from core.testcases import APITestCase
+from core.uuids import uuid7
+from stations.models import Station
+from stations.views import (
+    StationsBlockedViewSet,
+    StationViewSet,
+    active_stations_queryset,
+    station_bikes_queryset,
+)
+from salty_bikes import settings_api
+from users.models import User
+from users.views import TechViewSet, UserBlockedViewSet, UserListAPIView
+
+
+class SqlitePragmasTestCase(SimpleTestCase):
+    databases = {"default"}
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connection_is_configured(self):
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        # NORMAL
+        self.assertEqual(self.pragma("synchronous"), 1)
+
+    @override_settings(SQLITE_PRAGMAS={"busy_timeout": 1234})
+    def test_pragmas_come_from_settings(self):
+        self.addCleanup(configure_sqlite, None, connection)
+        configure_sqlite(None, connection)
+        self.assertEqual(self.pragma("busy_timeout"), 1234)
+
+
+@override_settings(DATABASE_HEALTH_CHECKS=True, DATABASE_HEALTH_CHECK_IDLE=10)
+class ConnectionHealthCheckTestCase(SimpleTestCase):
+    def check(self, connection):
+        with mock.patch(
+            "core.db.connections", SimpleNamespace(all=lambda: [connection])
+        ):
+            check_connections()
+
+    def connection(self, usable=False):
+        connection = mock.Mock(connection=object(), settings_dict={"CONN_MAX_AGE": 60})
+        connection.is_usable.return_value = usable
+        return connection
+
+    def test_busy_connection_is_not_pinged(self):
+        connection = self.connection()
+        with mock.patch(
+            "core.db.connections", SimpleNamespace(all=lambda: [connection])
+        ):
+            release_connections()
+        self.check(connection)
+        connection.is_usable.assert_not_called()
+
+    def test_broken_idle_connection_is_closed(self):
+        connection = self.connection()
+        connection.released_at = time.monotonic() - 11
+        self.check(connection)
+        connection.close.assert_called_once()
+
+    def test_working_idle_connection_is_kept(self):
+        connection = self.connection(usable=True)
+        connection.released_at = time.monotonic() - 11
+        self.check(connection)
+        connection.close.assert_not_called()
+
+
+class DatabaseUrlTestCase(SimpleTestCase):
+    def test_postgres_url(self):
+        self.assertEqual(
+            parse_database_url(
+                "postgres://salty:p%40ss@db:5432/salty_bikes?sslmode=require"
+            ),
+            {
+                "ENGINE": "django.db.backends.postgresql",
+                "NAME": "salty_bikes",
+                "USER": "salty",
+                "PASSWORD": "p@ss",
+                "HOST": "db",
+                "PORT": 5432,
+                "OPTIONS": {"sslmode": "require"},
+            },
+        )
+
+    def test_sqlite_url(self):
+        settings = parse_database_url("sqlite:////app/db.sqlite3")
+        self.assertEqual(settings["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(settings["NAME"], "/app/db.sqlite3")
+
+    def test_unsupported_scheme(self):
+        with self.assertRaises(ImproperlyConfigured):
+            parse_database_url("mysql://localhost/salty_bikes")
+
+
+class CacheUrlTestCase(SimpleTestCase):
+    def test_db_url(self):
+        self.assertEqual(
+            parse_cache_url("db://django_cache"),
+            {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "django_cache",
+            },
+        )
+
+    def test_file_url(self):
+        settings = parse_cache_url("file:///var/tmp/salty_bikes")
+        self.assertEqual(
+            settings["BACKEND"], "django.core.cache.backends.filebased.FileBasedCache"
+        )
+        self.assertEqual(settings["LOCATION"], "/var/tmp/salty_bikes")
+
+    def test_memcached_url(self):
+        settings = parse_cache_url("memcached://cache1:11211,cache2:11211")
+        self.assertEqual(settings["LOCATION"], ["cache1:11211", "cache2:11211"])
+
+    def test_unsupported_scheme(self):
+        with self.assertRaises(ImproperlyConfigured):
+            parse_cache_url("redis://localhost:6379")
+
+
+class SharedCacheCheckTestCase(SimpleTestCase):
+    local_cache = {"default": parse_cache_url("locmem://")}
+    shared_cache = {"default": parse_cache_url("memcached://127.0.0.1:11211")}
+
+    @override_settings(CACHES=local_cache, SIGNED_TOKENS=True, REPLICA_DATABASE=None)
+    def test_signed_tokens_refused_with_local_cache(self):
+        self.assertEqual(
+            [error.id for error in check_shared_cache(None)], ["core.E001"]
+        )
+
+    @override_settings(CACHES=shared_cache, SIGNED_TOKENS=True)
+    def test_signed_tokens_with_shared_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(CACHES=local_cache, REPLICA_DATABASE="replica")
+    def test_replica_refused_with_local_cache(self):
+        self.assertEqual(
+            [error.id for error in check_shared_cache(None)], ["core.E002"]
+        )
+
+    @override_settings(CACHES=shared_cache, REPLICA_DATABASE="replica")
+    def test_replica_with_shared_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(CACHES=local_cache, SIGNED_TOKENS=False)
+    def test_local_cache_without_signed_tokens(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+class ReplicaRouterTestCase(SimpleTestCase):
+    @override_settings(REPLICA_DATABASE="replica")
+    def test_read_only_reads_go_to_replica(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Station))
+        with read_only():
+            self.assertEqual(router.db_for_read(Station), "replica")
+            self.assertIsNone(router.db_for_write(Station))
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_without_replica_reads_go_to_default(self):
+        with read_only():
+            self.assertIsNone(ReplicaRouter().db_for_read(Station))
+
+
+# replica mirrors default database in tests, so only the routing decisions are checked
+@override_settings(REPLICA_DATABASE="default")
+class ReplicaReadsTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.station = Station.objects.create(name="Station")
+        self.read_only_reads = []
+        patcher = mock.patch.object(
+            ReplicaRouter, "db_for_read", side_effect=self.record_read
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record_read(self, model, **hints):
+        self.read_only_reads.append(read_only_marker.get())
+        return None
+
+    def test_list_reads_from_replica(self):
+        response = self.client.get(reverse("station-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.read_only_reads)
+        self.assertTrue(all(self.read_only_reads))
+
+    def test_safe_custom_actions_read_from_replica(self):
+        self.client.get(reverse("station-active"))
+        self.client.get(reverse("station-bikes", kwargs={"pk": self.station.pk}))
+        self.assertTrue(self.read_only_reads)
+        self.assertTrue(all(self.read_only_reads))
+
+    def test_writes_read_from_primary(self):
+        response = self.client.post(
+            reverse("station-list"), {"name": "New station", "bikesLimit": 10}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(any(self.read_only_reads))
+
+    def test_reads_after_write_stay_on_primary(self):
+        self.client.post(reverse("stations-blocked-list"), {"id": self.station.pk})
+        self.read_only_reads.clear()
+        self.client.get(reverse("stations-blocked-list"))
+        self.assertTrue(self.read_only_reads)
+        self.assertFalse(any(self.read_only_reads))
+
+    def test_marker_is_cleared_after_request(self):
+        self.client.get(reverse("station-list"))
+        self.assertFalse(read_only_marker.get())
+
+
+class ApiSettingsTestCase(APITestCase):
+    """
+    Serves requests with apps, middleware, URLs and renderers of the API-only settings.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.key}")
+        profile = override_settings(
+            INSTALLED_APPS=settings_api.INSTALLED_APPS,
+            MIDDLEWARE=settings_api.MIDDLEWARE,
+            ROOT_URLCONF=settings_api.BASE_URLCONF,
+            REST_FRAMEWORK=settings_api.REST_FRAMEWORK,
+        )
+        profile.enable()
+        self.addCleanup(profile.disable)
+
+    def test_serves_api_request(self):
+        station = Station.objects.create(name="Station")
+        response = self.client.get(reverse("station-active"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            [s["id"] for s in response.json()["stations"]], [str(station.id)]
+        )
+
+    def test_logs_in_without_sessions(self):
+        self.user.set_password("password")
+        self.user.save()
+        self.client.credentials()
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "password"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("sessionid", response.cookies)
+
+    def test_admin_and_documentation_are_left_out(self):
+        for path in ("/admin/", "/swagger.json", "/redoc/"):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+# Postgres plans sequential scans for tiny test tables regardless of indexes
+@skipUnless(connection.vendor == "sqlite", "query plans are checked on SQLite")
+class HotQueryPlanTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="user")
+        self.station = Station.objects.create(name="Station")
+        # bikes of every status, so that prefetches of their stations run too
+        Bike.objects.create(station=self.station)
+        Bike.objects.create(station=self.station, status=BikeStatus.blocked)
+        Bike.objects.create(user=self.user, status=BikeStatus.rented)
+        reserved = Bike.objects.create(station=self.station)
+        reserved.reserve(self.user)
+
+    def assertNoFullScan(self, queryset) -> int:
+        """
+        Check plans of all queries run to evaluate the queryset, prefetches included.
+
+        :return: number of checked queries
+        """
+        with CaptureQueriesContext(connection) as context:
+            list(queryset)
+        for query in context.captured_queries:
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plan = "\n".join(row[-1] for row in cursor.fetchall())
+            # SEARCH uses an index, SCAN reads the whole table or index
+            self.assertIsNone(
+                re.search(r"\bSCAN\b", plan),
+                f"Full scan in:\n{query['sql']}\n{plan}",
+            )
+        return len(context.captured_queries)
+
+    def viewset_queryset(self, viewset):
+        request = SimpleNamespace(user=self.user)
+        return viewset(request=request, action="list").get_queryset()
+
+    def test_bikes_at_station(self):
+        request = SimpleNamespace(user=self.user, method="GET")
+        stations = (
+            StationViewSet(request=request, action="bikes")
+            .get_queryset()
+            .filter(pk=self.station.pk)
+        )
+        self.assertNoFullScan(stations)
+        # bikes with their users, the station is the one loaded above
+        self.assertEqual(
+            self.assertNoFullScan(station_bikes_queryset(stations.get())), 1
+        )
+
+    def test_active_bikes_count_uses_both_index_columns(self):
+        plan = active_stations_queryset().explain()
+        self.assertIn("bike_station_status_idx (station_id=? AND status=?)", plan)
+
+    def test_rented_bikes(self):
+        # rented bikes have no station to prefetch
+        self.assertEqual(
+            self.assertNoFullScan(self.viewset_queryset(BikesRentedViewSet)), 1
+        )
+
+    def test_reserved_bikes(self):
+        # bikes with users, their stations with available bike counts
+        self.assertEqual(
+            self.assertNoFullScan(self.viewset_queryset(BikesReservedViewSet)), 2
+        )
+
+    def test_blocked_bikes(self):
+        # bikes with users, their stations with available bike counts
+        self.assertEqual(
+            self.assertNoFullScan(self.viewset_queryset(BikesBlockedViewSet)), 2
+        )
+
+    def test_active_stations(self):
+        self.assertNoFullScan(active_stations_queryset())
+
+    def test_blocked_stations(self):
+        self.assertNoFullScan(self.viewset_queryset(StationsBlockedViewSet))
+
+    def test_users(self):
+        self.assertNoFullScan(self.viewset_queryset(UserListAPIView))
+
+    def test_blocked_users(self):
+        self.assertNoFullScan(self.viewset_queryset(UserBlockedViewSet))
+
+    def test_techs(self):
+        self.assertNoFullScan(self.viewset_queryset(TechViewSet))
+
+    def test_overdue_reservations(self):
+        self.assertNoFullScan(Reservation.objects.overdue(timezone.now()))
+
+
+class Uuid7TestCase(SimpleTestCase):
+    def test_version_and_variant(self):
+        value = uuid7()
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+
+    def test_values_increase(self):
+        values = [uuid7() for _ in range(1000)]
+        self.assertEqual(values, sorted(values))
+        # also in the hex form stored by SQLite
+        self.assertEqual([v.hex for v in values], sorted(v.hex for v in values))
+        self.assertEqual(len(set(values)), len(values))
+
+    def test_starts_with_timestamp(self):
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        after = time.time_ns() // 1_000_000
+        self.assertTrue(before <= value.int >> 80 <= after)
+
+
+@skipUnless(apps.is_installed("drf_yasg"), "API documentation is not installed")
+@override_settings(ROOT_URLCONF="salty_bikes.urls")
+class PrebuiltSchemaTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(OPENAPI_SCHEMA_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def build(self):
+        call_command("build_schema", stdout=io.StringIO())
+
+    def test_serves_built_schema_without_generating_it(self):
+        self.build()
+        with mock.patch.object(OpenAPISchemaGenerator, "get_schema") as get_schema:
+            response = self.client.get("/swagger.json")
+            yaml_response = self.client.get("/swagger.yaml")
+        get_schema.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("/stations/active/", response.json()["paths"])
+        self.assertEqual(yaml_response.status_code, status.HTTP_200_OK)
+        self.assertTrue(yaml_response.content.startswith(b"swagger:"))
+
+    def test_not_modified(self):
+        self.build()
+        etag = self.client.get("/swagger.json")["ETag"]
+        response = self.client.get("/swagger.json", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_generates_schema_until_built(self):
+        response = self.client.get("/swagger.json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("/stations/active/", response.json()["paths"])
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_ui_loads_built_schema(self):
+        for url in ("/swagger/", "/redoc/"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(b"/swagger.json", response.content)
@@ -0,0 +1,33 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+# last 48 bit timestamp and 74 random bits, as a single number
+_last_sequence = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID version 7: 48 bits of unix time in milliseconds followed by
+    random bits.
+
+    Used as primary key default, so new rows land at the end of primary key indexes
+    instead of random pages all over them. Within a process values only increase,
+    also for many keys generated in the same millisecond.
+    """
+    global _last_sequence
+    timestamp = time.time_ns() // 1_000_000
+    sequence = (timestamp << 74) | (int.from_bytes(os.urandom(10), "big") >> 6)
+    with _lock:
+        if sequence <= _last_sequence:
+            sequence = _last_sequence + 1
+        _last_sequence = sequence
+    timestamp = (sequence >> 74) & 0xFFFF_FFFF_FFFF
+    rand_a = (sequence >> 62) & 0xFFF
+    rand_b = sequence & ((1 << 62) - 1)
+    # version 7 and RFC 4122 variant bits in between
+    return uuid.UUID(
+        int=(timestamp << 80) | (0x7 << 76) | (rand_a << 64) | (0x2 << 62) | rand_b
+    )
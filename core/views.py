@@ -0,0 +1,43 @@
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db import is_stuck_to_primary, read_only_marker, stick_to_primary
+
+
+class ReplicaReadsMixin:
+    """
+    Serves reads of safe `replica_actions` from the replica database.
+
+    Authentication still reads from the default database, so freshly issued tokens
+    work. After a successful write, user reads from the default database for
+    REPLICA_LAG seconds, so they see their own changes.
+    """
+
+    replica_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.use_replica(request):
+            self._read_only_token = read_only_marker.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_read_only_token", None)
+        if token is not None:
+            read_only_marker.reset(token)
+            self._read_only_token = None
+        if (
+            settings.REPLICA_DATABASE
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            stick_to_primary(request.user.id)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def use_replica(self, request) -> bool:
+        return (
+            settings.REPLICA_DATABASE is not None
+            and request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+            and not is_stuck_to_primary(request.user.id)
+        )
@@ -0,0 +1,41 @@
+"""
+Gunicorn configuration used to serve the project in production.
+
+Every setting can be overridden from environment or `.env` file, run with:
+`gunicorn salty_bikes.wsgi`
+"""
+
+import multiprocessing
+
+# not `from decouple import config`, as gunicorn reads every name here as a setting
+import decouple
+
+bind = decouple.config("GUNICORN_BIND", default="0.0.0.0:8080")
+
+# pre-forked worker processes, each serving requests from a pool of threads
+workers = decouple.config(
+    "GUNICORN_WORKERS", default=multiprocessing.cpu_count() * 2 + 1, cast=int
+)
+# uvicorn.workers.UvicornWorker serves salty_bikes.asgi:application instead
+worker_class = decouple.config("GUNICORN_WORKER_CLASS", default="gthread")
+threads = decouple.config("GUNICORN_THREADS", default=4, cast=int)
+
+# seconds an idle client connection is kept open for next requests
+keepalive = decouple.config("GUNICORN_KEEPALIVE", default=5, cast=int)
+
+# workers are replaced after this many requests (plus random jitter, so they do not
+# restart all at once), which bounds memory growth, 0 disables it
+max_requests = decouple.config("GUNICORN_MAX_REQUESTS", default=1000, cast=int)
+max_requests_jitter = decouple.config(
+    "GUNICORN_MAX_REQUESTS_JITTER", default=100, cast=int
+)
+
+timeout = decouple.config("GUNICORN_TIMEOUT", default=30, cast=int)
+graceful_timeout = decouple.config("GUNICORN_GRACEFUL_TIMEOUT", default=30, cast=int)
+
+# HTTPS, previously provided by runserver_plus
+certfile = decouple.config("GUNICORN_CERTFILE", default=None)
+keyfile = decouple.config("GUNICORN_KEYFILE", default=None)
+
+errorlog = "-"
+accesslog = decouple.config("GUNICORN_ACCESSLOG", default=None)
@@ -1,2 +1,3 @@
 #! /bin/sh
-python manage.py runserver_plus 0.0.0.0:8080 --cert fake_cert
\ No newline at end of file
+# production server, configured by GUNICORN_* variables, see gunicorn.conf.py
+exec gunicorn salty_bikes.wsgi
@@ -0,0 +1,11 @@
+"""
+URLs of the API itself, without admin and API documentation.
+"""
+
+from django.urls import path, include
+
+urlpatterns = [
+    path("", include("bikes.urls")),
+    path("", include("stations.urls")),
+    path("", include("users.urls")),
+]
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "salty_bikes.settings")
+# serve async versions of hot read endpoints
+os.environ.setdefault("ROOT_URLCONF", "salty_bikes.asgi_urls")
 
 application = get_asgi_application()
@@ -0,0 +1,21 @@
+"""
+URLs of the ASGI entry point: async versions of hot read endpoints, login and register
+take precedence over the sync ones of BASE_URLCONF, which serve everything else.
+"""
+
+from django.conf import settings
+from django.urls import include, path, re_path
+
+from bikes.views import rented_bikes, reserved_bikes
+from stations.views import active_stations, station_bikes
+from users.views import login, register
+
+urlpatterns = [
+    re_path(r"^stations/active/?$", active_stations),
+    re_path(r"^stations/(?P<pk>[^/.]+)/bikes/?$", station_bikes),
+    re_path(r"^bikes/rented/?$", rented_bikes),
+    re_path(r"^bikes/reserved/?$", reserved_bikes),
+    re_path(r"^login/?$", login),
+    re_path(r"^register/?$", register),
+    path("", include(settings.BASE_URLCONF)),
+]
@@ -0,0 +1,14 @@
+"""
+Description of the API in its OpenAPI schema, see SWAGGER_SETTINGS.
+"""
+
+from drf_yasg import openapi
+
+info = openapi.Info(
+    title="Snippets API",
+    default_version="v1",
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
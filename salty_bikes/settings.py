@@ -9,9 +9,14 @@ https://docs.djangoproject.com/en/3.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
+import os
+
 from decouple import config
 from pathlib import Path
 
+from core.cache import parse_cache_url
+from core.db import parse_database_url
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,6 +49,7 @@ INSTALLED_APPS = [
     "drf_yasg",
     "django_extensions",
     # internal
+    "core",
     "users",
     "bikes",
     "stations",
@@ -58,7 +64,6 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
-    "core.middlewares.CheckReservationsMiddleware",
 ]
 
 CORS_ORIGIN_ALLOW_ALL = True
@@ -74,7 +79,10 @@ CORS_ALLOW_METHODS = [
     "PUT",
 ]
 
-ROOT_URLCONF = "salty_bikes.urls"
+# URLs of sync views, ROOT_URLCONF is set to salty_bikes.asgi_urls by the ASGI entry
+# point, which puts async views in front of them
+BASE_URLCONF = "salty_bikes.urls"
+ROOT_URLCONF = config("ROOT_URLCONF", default=BASE_URLCONF)
 
 TEMPLATES = [
     {
@@ -100,11 +108,49 @@ WSGI_APPLICATION = "salty_bikes.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        **parse_database_url(
+            config("DATABASE_URL", default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
+        ),
+        # seconds a connection is reused for, 0 closes it after every request
+        "CONN_MAX_AGE": config("DATABASE_CONN_MAX_AGE", default=60, cast=int),
     }
 }
 
+# Optional replica, serving reads of list and retrieve actions, see core/views.py
+if config("DATABASE_REPLICA_URL", default=""):
+    DATABASES["replica"] = {
+        **parse_database_url(config("DATABASE_REPLICA_URL")),
+        "CONN_MAX_AGE": DATABASES["default"]["CONN_MAX_AGE"],
+        # tests run against the default database only
+        "TEST": {"MIRROR": "default"},
+    }
+REPLICA_DATABASE = "replica" if "replica" in DATABASES else None
+# seconds after a write, for which user reads from the default database, kept in
+# Django cache, so a system check refuses the replica while CACHE_URL is process local
+REPLICA_LAG = config("REPLICA_LAG", default=5, cast=int)
+DATABASE_ROUTERS = ["core.db.ReplicaRouter"]
+
+# Cache of this process only by default, signed tokens and the replica need one shared
+# by all processes, e.g. `memcached://127.0.0.1:11211`. `db://django_cache` (after
+# `python manage.py createcachetable`) works too, at the cost of a query per lookup.
+CACHES = {"default": parse_cache_url(config("CACHE_URL", default="locmem://"))}
+
+# Ping persistent connections idle for DATABASE_HEALTH_CHECK_IDLE seconds at the start
+# of a request, replacing broken ones.
+DATABASE_HEALTH_CHECKS = config("DATABASE_HEALTH_CHECKS", default=True, cast=bool)
+DATABASE_HEALTH_CHECK_IDLE = config("DATABASE_HEALTH_CHECK_IDLE", default=10, cast=int)
+
+# Applied to every new SQLite connection. WAL lets readers work alongside a writer,
+# writers wait for the lock up to busy_timeout ms instead of failing right away.
+SQLITE_PRAGMAS = {
+    "journal_mode": config("SQLITE_JOURNAL_MODE", default="WAL"),
+    "busy_timeout": config("SQLITE_BUSY_TIMEOUT", default=5000, cast=int),
+    "synchronous": config("SQLITE_SYNCHRONOUS", default="NORMAL"),
+    "mmap_size": config("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024, cast=int),
+    # negative value is in KiB instead of pages
+    "cache_size": config("SQLITE_CACHE_SIZE", default=-64 * 1024, cast=int),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -145,12 +191,49 @@ USE_TZ = True
 STATIC_URL = "/static/"
 
 AUTH_USER_MODEL = "users.User"
+# checks passwords in the bounded pool of PASSWORD_HASHING_WORKERS threads
+AUTHENTICATION_BACKENDS = ["core.backends.HashingPoolBackend"]
 
 
 # Django Rest Framework
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
+        "core.authentication.SignedTokenAuthentication",
         "core.authentication.BearerTokenAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
 }
+
+# OpenAPI schema is rendered to this directory by `python manage.py build_schema`
+# on deploy and served from memory, until then it is generated on each request.
+OPENAPI_SCHEMA_DIR = config("OPENAPI_SCHEMA_DIR", default=str(BASE_DIR / "schema"))
+SWAGGER_SETTINGS = {
+    "DEFAULT_INFO": "salty_bikes.schema.info",
+    # instead of the UI URL with ?format=openapi, which generates the schema
+    "SPEC_URL": ("schema-json", {"format": ".json"}),
+}
+REDOC_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+
+# Login and register hash passwords in a bounded pool of threads, requests finding
+# it full are answered with 503 instead of queueing up.
+PASSWORD_HASHING_WORKERS = config(
+    "PASSWORD_HASHING_WORKERS", default=os.cpu_count() or 1, cast=int
+)
+PASSWORD_HASHING_QUEUE = config(
+    "PASSWORD_HASHING_QUEUE", default=4 * PASSWORD_HASHING_WORKERS, cast=int
+)
+
+# Number of seconds after which login has to be repeated,
+# purge expired tokens with `python manage.py purge_expired_tokens`.
+TOKEN_TTL = config("TOKEN_TTL", default=24 * 60 * 60, cast=int)
+
+# In-process cache of authenticated tokens, set timeout to 0 to disable it.
+# Other processes learn about logouts and blocked users only once their entries expire.
+TOKEN_CACHE_TIMEOUT = config("TOKEN_CACHE_TIMEOUT", default=60, cast=int)
+TOKEN_CACHE_SIZE = config("TOKEN_CACHE_SIZE", default=10000, cast=int)
+
+# Issue stateless signed tokens on login and register instead of database ones.
+# Their deny-list lives in Django cache, which has to be shared by all processes.
+# Refused by a system check while CACHE_URL is process local.
+SIGNED_TOKENS = config("SIGNED_TOKENS", default=False, cast=bool)
+SIGNED_TOKEN_MAX_AGE = config("SIGNED_TOKEN_MAX_AGE", default=24 * 60 * 60, cast=int)
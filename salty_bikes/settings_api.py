@@ -0,0 +1,48 @@
+"""
+Settings of API-only workers, use with DJANGO_SETTINGS_MODULE=salty_bikes.settings_api
+
+Clients authenticate with bearer tokens only, so admin, API documentation, sessions,
+messages and CSRF protection are left out, together with their apps and middleware.
+Run admin and documentation from workers with the default settings.
+"""
+
+from salty_bikes.settings import *  # noqa: F401,F403
+from salty_bikes.settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, config
+
+INSTALLED_APPS = [
+    app
+    for app in INSTALLED_APPS
+    if app
+    not in (
+        "django.contrib.admin",
+        "django.contrib.sessions",
+        "django.contrib.messages",
+        "django.contrib.staticfiles",
+        "drf_yasg",
+        "django_extensions",
+    )
+]
+
+MIDDLEWARE = [
+    middleware
+    for middleware in MIDDLEWARE
+    if middleware
+    not in (
+        "django.contrib.sessions.middleware.SessionMiddleware",
+        "django.middleware.csrf.CsrfViewMiddleware",
+        # relies on sessions, DRF authenticates requests itself
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+        "django.contrib.messages.middleware.MessageMiddleware",
+        # protects HTML pages from being framed, the API serves JSON only
+        "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    )
+]
+
+BASE_URLCONF = "salty_bikes.api_urls"
+ROOT_URLCONF = config("ROOT_URLCONF", default=BASE_URLCONF)
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    # no browsable API, which renders HTML templates
+    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+}
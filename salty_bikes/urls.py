@@ -4,17 +4,12 @@ from django.urls import path, include, re_path
 
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+
+from core.schema import prebuilt_schema_view
+from salty_bikes.schema import info
 
 schema_view = get_schema_view(
-    openapi.Info(
-        title="Snippets API",
-        default_version="v1",
-        description="Test description",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@snippets.local"),
-        license=openapi.License(name="BSD License"),
-    ),
+    info,
     public=True,
     permission_classes=(permissions.AllowAny,),
 )
@@ -22,7 +17,7 @@ schema_view = get_schema_view(
 urlpatterns = [
     re_path(
         r"^swagger(?P<format>\.json|\.yaml)$",
-        schema_view.without_ui(cache_timeout=0),
+        prebuilt_schema_view(schema_view.without_ui(cache_timeout=0)),
         name="schema-json",
     ),
     path(
@@ -32,7 +27,5 @@ urlpatterns = [
     ),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
     path("admin/", admin.site.urls),
-    path("", include("bikes.urls")),
-    path("", include("stations.urls")),
-    path("", include("users.urls")),
+    path("", include("salty_bikes.api_urls")),
 ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-17 17:57
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_bikes(apps, schema_editor):
+    Station = apps.get_model("stations", "Station")
+    for station in Station.objects.annotate(
+        total=Count("bikes"),
+        available=Count("bikes", filter=Q(bikes__status="available")),
+    ):
+        station.bikes_total = station.total
+        station.bikes_available = station.available
+        station.save(update_fields=["bikes_total", "bikes_available"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bikes", "0010_malfunction"),
+        ("stations", "0010_rename_state_station_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="station",
+            name="bikes_available",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="station",
+            name="bikes_total",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_bikes, migrations.RunPython.noop),
+    ]
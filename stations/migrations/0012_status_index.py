@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stations", "0011_station_bike_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="station",
+            index=models.Index(fields=["status"], name="station_status_idx"),
+        ),
+    ]
@@ -1,6 +1,8 @@
-import uuid
-
 from django.db import models
+from django.db.models import F
+
+from core.queries import count_subquery
+from core.uuids import uuid7
 
 
 class StationStatus(models.TextChoices):
@@ -8,8 +10,53 @@ class StationStatus(models.TextChoices):
     blocked = "blocked"
 
 
+class StationQuerySet(models.QuerySet):
+    def update_bike_counts(self) -> int:
+        """
+        Recompute bike counters of stations from their bikes in a single UPDATE.
+        """
+        from bikes.models import Bike, BikeStatus
+
+        return self.update(
+            bikes_total=count_subquery(Bike.objects.all(), "station"),
+            bikes_available=count_subquery(
+                Bike.objects.filter(status=BikeStatus.available), "station"
+            ),
+        )
+
+    def with_active_bikes_count(self):
+        """
+        Annotate stations with `active_bikes_count`, the number of bikes available for
+        rent: the counter plus reserved bikes whose reservation expired, which the
+        expiry worker did not make available yet.
+
+        Reservations are counted through reserved bikes of the station, so the lookup
+        uses both columns of the bike station and status index.
+        """
+        from bikes.models import BikeStatus, Reservation
+
+        overdue = Reservation.objects.overdue().filter(bike__status=BikeStatus.reserved)
+        return self.annotate(
+            active_bikes_count=F("bikes_available")
+            + count_subquery(overdue, "bike__station")
+        )
+
+    def add_bikes(self, total: int = 0, available: int = 0) -> int:
+        """
+        Atomically shift bike counters of stations by given amounts.
+        """
+        return self.update(
+            bikes_total=F("bikes_total") + total,
+            bikes_available=F("bikes_available") + available,
+        )
+
+
+# changed only by UPDATEs relative to the stored values, see StationQuerySet
+COUNTER_FIELDS = ("bikes_total", "bikes_available")
+
+
 class Station(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     status = models.CharField(
         max_length=7,
         choices=StationStatus.choices,
@@ -18,23 +65,40 @@ class Station(models.Model):
     )
     name = models.CharField(max_length=255)
     bikesLimit = models.PositiveIntegerField(default=10)
+    # denormalized counts of bikes at station, maintained by Bike
+    bikes_total = models.PositiveIntegerField(default=0, editable=False)
+    bikes_available = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = StationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # active and blocked stations
+            models.Index(fields=["status"], name="station_status_idx"),
+        ]
 
     def __str__(self):
         return f"Station at {self.name} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        # counters of a station loaded earlier may be stale, never write them back
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def block(self):
         self.status = StationStatus.blocked
-        self.save()
+        self.save(update_fields=["status"])
 
     def unblock(self):
         self.status = StationStatus.working
-        self.save()
+        self.save(update_fields=["status"])
 
-    def cancel_all_reservations(self):
-        from bikes.models import BikeStatus
+    def cancel_all_reservations(self) -> int:
+        from bikes.models import Reservation
 
-        bikes = self.bikes.all()
-        # TODO(arkadiusz-gorecki): optimize this to fix N + 1 problem
-        for bike in bikes:
-            if bike.status == BikeStatus.reserved:
-                bike.cancel_reservation()
+        return Reservation.objects.filter(bike__station=self).cancel()
@@ -1,7 +1,6 @@
 from rest_framework.fields import SerializerMethodField
 from rest_framework.serializers import ModelSerializer
 
-from bikes.models import BikeStatus
 from stations.models import Station
 
 
@@ -14,4 +13,14 @@ class StationSerializer(ModelSerializer):
 
     @staticmethod
     def get_activeBikesCount(station):  # noqa
-        return station.bikes.filter(status=BikeStatus.available).count()
+        # prefer count annotated by StationQuerySet.with_active_bikes_count if present
+        if hasattr(station, "active_bikes_count"):
+            return station.active_bikes_count
+        from bikes.models import BikeStatus, Reservation
+
+        return (
+            station.bikes_available
+            + Reservation.objects.overdue()
+            .filter(bike__station=station, bike__status=BikeStatus.reserved)
+            .count()
+        )
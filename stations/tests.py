@@ -1,3 +1,10 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import OperationalError, connection
+from django.conf import settings
+from django.test import AsyncClient, TransactionTestCase, override_settings
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.reverse import reverse
@@ -259,6 +266,22 @@ class StationBlockTestCase(APITestCase):
         self.client.post(reverse("stations-blocked-list"), {"id": f"{station.id}"})
         self.assertFalse(Reservation.objects.filter(id=reservation.id).exists())
 
+    def test_cancel_reservations_after_block_query_count(self):
+        station = Station.objects.create(name="Good 'ol station", bikesLimit=200)
+        Bike.objects.create(station=station)
+        for _ in range(20):
+            Bike.objects.create(station=station).reserve(self.user)
+        # station lookup, transaction with station update, bike update,
+        # station and user counters update and reservation delete,
+        # station reload with available bikes count for response
+        with self.assertNumQueries(11):
+            response = self.client.post(
+                reverse("stations-blocked-list"), {"id": f"{station.id}"}
+            )
+        self.assertEqual(response.data["activeBikesCount"], 21)
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(station.bikes.filter(status=BikeStatus.reserved).exists())
+
 
 class StationBlockedListTestCase(APITestCase):
     def test_list_blocked_stations_status_code(self):
@@ -505,6 +528,20 @@ class ListBikesAtStationTestCase(APITestCase):
             },
         )
 
+    def test_list_bikes_at_station_includes_expired_reservation(self):
+        station = Station.objects.create(name="Station Name 1")
+        bike = Bike.objects.create(station=station, status=BikeStatus.reserved)
+        time = timezone.now()
+        Reservation.objects.create(
+            bike=bike,
+            user=self.user,
+            reserved_at=time - timezone.timedelta(minutes=31),
+            reserved_till=time - timezone.timedelta(minutes=1),
+        )
+        response = self.client.get(reverse("station-bikes", kwargs={"pk": station.id}))
+        self.assertEqual(len(response.data["bikes"]), 1)
+        self.assertEqual(response.data["bikes"][0]["status"], BikeStatus.available)
+
 
 class ActiveStationListGetTestCase(APITestCase):
     def test_get_active_stations_status_code(self):
@@ -537,3 +574,131 @@ class ActiveStationListGetTestCase(APITestCase):
                 ],
             },
         )
+
+
+class StationListQueryCountTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(10):
+            station = Station.objects.create(
+                name=f"Station {i}",
+                status=StationStatus.blocked if i % 2 else StationStatus.working,
+            )
+            Bike.objects.create(station=station)
+            Bike.objects.create(station=station, status=BikeStatus.blocked)
+
+    def test_list_stations_query_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("station-list"))
+        self.assertEqual(len(response.data["stations"]), 10)
+        for station in response.data["stations"]:
+            self.assertEqual(station["activeBikesCount"], 1)
+
+    def test_list_active_stations_query_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("station-active"))
+        self.assertEqual(len(response.data["stations"]), 5)
+
+    def test_list_blocked_stations_query_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("stations-blocked-list"))
+        self.assertEqual(len(response.data["stations"]), 5)
+
+
+class StationConcurrentReturnTestCase(TransactionTestCase):
+    returns = 200
+
+    def setUp(self):
+        super().setUp()
+        self.station = Station.objects.create(name="Busy station", bikesLimit=50)
+        self.bikes = []
+        for i in range(self.returns):
+            user = User.objects.create(username=f"user-{i}")
+            bike = Bike.objects.create()
+            bike.rent(user)
+            self.bikes.append(bike)
+
+    def return_bike(self, bike):
+        try:
+            for _ in range(100):
+                try:
+                    return bike.return_to_station(Station(id=self.station.id))
+                except OperationalError:
+                    # sqlite allows a single writer, wait for others to finish
+                    time.sleep(0.01)
+            raise AssertionError("Bike could not be returned")
+        finally:
+            connection.close()
+
+    def test_concurrent_returns_never_exceed_capacity(self):
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(self.return_bike, self.bikes))
+        elapsed = time.monotonic() - start
+
+        self.station.refresh_from_db()
+        self.assertEqual(results.count(True), self.station.bikesLimit)
+        self.assertEqual(self.station.bikes.count(), self.station.bikesLimit)
+        self.assertEqual(self.station.bikes_total, self.station.bikesLimit)
+        self.assertLess(elapsed, 30, f"{self.returns} returns took {elapsed:.1f}s")
+
+
+@override_settings(ROOT_URLCONF="salty_bikes.asgi_urls")
+class StationAsyncViewsTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+        # AsyncClient sends extra arguments as raw headers
+        self.auth = {"Authorization": f"Bearer {self.token.key}"}
+        self.station = Station.objects.create(name="Station")
+        self.bike = Bike.objects.create(station=self.station)
+        Station.objects.create(name="Blocked station", status=StationStatus.blocked)
+
+    async def test_active_stations(self):
+        response = await self.async_client.get("/stations/active", **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [station["id"] for station in response.json()["stations"]],
+            [str(self.station.id)],
+        )
+
+    async def test_active_stations_unauthenticated(self):
+        response = await self.async_client.get("/stations/active")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_active_stations_invalid_token(self):
+        response = await self.async_client.get(
+            "/stations/active", Authorization="Bearer invalid"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_bikes_at_station(self):
+        response = await self.async_client.get(
+            f"/stations/{self.station.id}/bikes", **self.auth
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [bike["id"] for bike in response.json()["bikes"]], [str(self.bike.id)]
+        )
+
+    async def test_bikes_at_missing_station(self):
+        response = await self.async_client.get("/stations/missing/bikes", **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), {"message": "Station not found."})
+
+    def test_same_response_as_sync_view(self):
+        with override_settings(ROOT_URLCONF=settings.BASE_URLCONF):
+            expected = self.client.get(reverse("station-active")).json()
+        self.assertEqual(self.client.get("/stations/active").json(), expected)
+
+    async def test_bike_return_is_served_by_sync_view(self):
+        rented = await sync_to_async(Bike.objects.create)(
+            user=self.user, status=BikeStatus.rented
+        )
+        response = await self.async_client.post(
+            f"/stations/{self.station.id}/bikes",
+            {"id": str(rented.id)},
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
@@ -1,8 +1,10 @@
+from django.db import transaction
 from django.http import Http404
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework import status, mixins, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.mixins import (
     CreateModelMixin,
     ListModelMixin,
@@ -13,14 +15,17 @@ from rest_framework.viewsets import GenericViewSet
 
 from bikes.models import Bike, BikeStatus
 from bikes.serializers import ReadBikeSerializer
+from core.async_views import async_read_view
 from core.decorators import restrict
 from core.serializers import MessageSerializer, IdSerializer
+from core.views import ReplicaReadsMixin
 from stations.models import Station, StationStatus
 from stations.serializers import StationSerializer
 from users.models import UserRole
 
 
 class StationViewSet(
+    ReplicaReadsMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
@@ -29,6 +34,19 @@ class StationViewSet(
 ):
     queryset = Station.objects.all()
     serializer_class = StationSerializer
+    replica_actions = ("list", "retrieve", "active", "bikes")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # counts would go stale on actions that move bikes around, so only annotate reads
+        if self.action in ("list", "retrieve") or (
+            # no request while the schema is built
+            self.action == "bikes"
+            and self.request is not None
+            and self.request.method == "GET"
+        ):
+            return queryset.with_active_bikes_count()
+        return queryset
 
     def handle_exception(self, exc):
         if isinstance(exc, Http404):
@@ -73,11 +91,7 @@ class StationViewSet(
     @action(detail=False, methods=["get"])
     @restrict(UserRole.user, UserRole.tech, UserRole.admin)
     def active(self, request, *args, **kwargs):
-        stations = Station.objects.filter(status=StationStatus.working)
-        return Response(
-            status=status.HTTP_200_OK,
-            data={"stations": StationSerializer(stations, many=True).data},
-        )
+        return active_stations_response()
 
     @action(detail=True, methods=["get", "post"])
     @restrict(UserRole.admin, UserRole.tech, UserRole.user)
@@ -88,12 +102,7 @@ class StationViewSet(
             return self.return_bike_to_station(request, *args, **kwargs)
 
     def list_bikes_at_station(self, request, *args, **kwargs):
-        station = self.get_object()
-        bikes = station.bikes.filter(status=BikeStatus.available)
-        return Response(
-            status=status.HTTP_200_OK,
-            data={"bikes": ReadBikeSerializer(bikes, many=True).data},
-        )
+        return station_bikes_response(self.get_object())
 
     def return_bike_to_station(self, request, *args, **kwargs):
         """
@@ -113,17 +122,35 @@ class StationViewSet(
             return Response(
                 {"message": "Bike not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        if bike.status != BikeStatus.rented or bike.station is not None:
+        if bike.status != BikeStatus.rented or bike.station_id is not None:
             return Response(
                 {"message": "Bike not rented."},
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
-        if request.user != bike.user:
+        if request.user.id != bike.user_id:
             return Response(
                 {"message": "User returning the bike is not the user that rented it."},
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
         station = self.get_object()
+        error_response = self.return_error_response(station)
+        if error_response:
+            return error_response
+
+        if not bike.return_to_station(station):
+            # station or bike changed since we loaded them, report what stops the return
+            station.refresh_from_db()
+            return self.return_error_response(station) or Response(
+                {"message": "Bike not rented."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(
+            data=ReadBikeSerializer(bike).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @staticmethod
+    def return_error_response(station):
         if station.status == StationStatus.blocked:
             return Response(
                 {
@@ -131,22 +158,18 @@ class StationViewSet(
                 },
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
-        if station.bikes.count() >= station.bikesLimit:
+        if station.bikes_total >= station.bikesLimit:
             return Response(
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 data={
                     "message": "Cannot associate specified bike with specified station, station is full."
                 },
             )
-        bike.return_to_station(station)
-
-        return Response(
-            data=ReadBikeSerializer(bike).data,
-            status=status.HTTP_201_CREATED,
-        )
+        return None
 
 
 class StationsBlockedViewSet(
+    ReplicaReadsMixin,
     CreateModelMixin,
     ListModelMixin,
     DestroyModelMixin,
@@ -157,6 +180,9 @@ class StationsBlockedViewSet(
     request_serializer = IdSerializer
     message_serializer = MessageSerializer
 
+    def get_queryset(self):
+        return super().get_queryset().with_active_bikes_count()
+
     @swagger_auto_schema(
         request_body=request_serializer,
         responses={
@@ -193,8 +219,11 @@ class StationsBlockedViewSet(
                 {"message": "Station already blocked."},
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
-        station.block()
-        station.cancel_all_reservations()
+        with transaction.atomic():
+            station.block()
+            station.cancel_all_reservations()
+        # counters were recomputed in the database by cancelling the reservations
+        station = Station.objects.with_active_bikes_count().get(id=station.id)
         return Response(
             self.serializer_class(station).data,
             status=status.HTTP_201_CREATED,
@@ -239,3 +268,64 @@ class StationsBlockedViewSet(
             )
         station.unblock()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def active_stations_queryset():
+    return Station.objects.with_active_bikes_count().filter(
+        status=StationStatus.working
+    )
+
+
+def station_bikes_queryset(station):
+    return station.bikes.available().with_related()
+
+
+def active_stations_response() -> Response:
+    return Response(
+        status=status.HTTP_200_OK,
+        data={
+            "stations": StationSerializer(active_stations_queryset(), many=True).data
+        },
+    )
+
+
+def station_bikes_response(station) -> Response:
+    """
+    :param station: annotated by StationQuerySet.with_active_bikes_count, its bikes
+        are serialized with it instead of fetching it again
+    """
+    bikes = station_bikes_queryset(station)
+    return Response(
+        status=status.HTTP_200_OK,
+        data={"bikes": ReadBikeSerializer(bikes, many=True).data},
+    )
+
+
+# async versions of hot read endpoints, served by the ASGI entry point
+
+
+@async_read_view(
+    UserRole.user,
+    UserRole.tech,
+    UserRole.admin,
+    fallback=StationViewSet.as_view({"get": "active"}),
+)
+def active_stations(request):
+    return active_stations_response()
+
+
+@async_read_view(
+    UserRole.admin,
+    UserRole.tech,
+    UserRole.user,
+    fallback=StationViewSet.as_view({"get": "bikes", "post": "bikes"}),
+)
+def station_bikes(request, pk):
+    try:
+        station = get_object_or_404(Station.objects.with_active_bikes_count(), pk=pk)
+    except Http404:
+        return Response(
+            {"message": "Station not found."},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    return station_bikes_response(station)
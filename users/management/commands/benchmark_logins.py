@@ -0,0 +1,84 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+
+from core.hashing import HashingPool, PoolSaturated
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how many password checks per second, the dominant cost of a login, "
+        "run on the request thread and in the hashing pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--logins",
+            type=int,
+            default=100,
+            help="Number of password checks in each run.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.PASSWORD_HASHING_WORKERS,
+            help="Number of hashing pool threads.",
+        )
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=32,
+            help="Number of concurrent clients logging in.",
+        )
+
+    def handle(self, *args, **options):
+        logins = options["logins"]
+        encoded = make_password("password")
+        cores = os.cpu_count() or 1
+        self.stdout.write(f"{cores} cores, {options['workers']} hashing threads")
+
+        start = time.perf_counter()
+        for _ in range(logins):
+            check_password("password", encoded)
+        self.report("request thread", logins, time.perf_counter() - start, cores)
+
+        pool = HashingPool(workers=options["workers"], max_queued=logins)
+        with ThreadPoolExecutor(max_workers=options["clients"]) as clients:
+            start = time.perf_counter()
+            results = list(
+                clients.map(
+                    lambda _: pool.check_password("password", encoded), range(logins)
+                )
+            )
+            self.report(
+                "hashing pool", len(results), time.perf_counter() - start, cores
+            )
+
+        # default queue limit, logins beyond it are answered with 503
+        pool = HashingPool(
+            workers=options["workers"], max_queued=settings.PASSWORD_HASHING_QUEUE
+        )
+
+        def login(_):
+            try:
+                return pool.check_password("password", encoded)
+            except PoolSaturated:
+                return None
+
+        with ThreadPoolExecutor(max_workers=options["clients"]) as clients:
+            start = time.perf_counter()
+            results = list(clients.map(login, range(logins)))
+            elapsed = time.perf_counter() - start
+        accepted = sum(result is not None for result in results)
+        self.report("hashing pool with queue limit", accepted, elapsed, cores)
+        self.stdout.write(f"  rejected {logins - accepted} logins with 503")
+
+    def report(self, name, logins, elapsed, cores):
+        per_second = logins / elapsed
+        self.stdout.write(
+            f"{name}: {per_second:.1f} logins/s, {per_second / cores:.1f} logins/s per core"
+        )
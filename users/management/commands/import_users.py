@@ -0,0 +1,115 @@
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from users.models import User, UserRole
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV or JSONL file with `login`, `password` and optional "
+        "`role` of each user, together with their authentication tokens."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file with users.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="File format, guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of users inserted in a single transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of processes hashing passwords, one per core by default.",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or options["path"].rsplit(".", 1)[-1].lower()
+        if file_format not in ("csv", "jsonl"):
+            raise CommandError("Unknown file format, use --format.")
+        self.workers = options["workers"] or os.cpu_count() or 1
+        imported = skipped = 0
+        start = time.perf_counter()
+        with open(options["path"], newline="") as file, ProcessPoolExecutor(
+            max_workers=self.workers, initializer=django.setup
+        ) as pool:
+            rows = (
+                self.read_csv(file) if file_format == "csv" else self.read_jsonl(file)
+            )
+            while True:
+                chunk = list(itertools.islice(rows, options["chunk_size"]))
+                if not chunk:
+                    break
+                created = self.import_chunk(chunk, pool)
+                imported += created
+                skipped += len(chunk) - created
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"Imported {imported} users.")
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Imported {imported} users, skipped {skipped} "
+            f"in {elapsed:.1f}s ({(imported + skipped) / elapsed:.0f} rows/s)."
+        )
+
+    def import_chunk(self, chunk, pool) -> int:
+        """
+        :return: number of created users, invalid rows and taken usernames are skipped
+        """
+        rows = {}
+        for row in chunk:
+            login, password = row.get("login"), row.get("password")
+            role = row.get("role") or UserRole.user
+            if not login or not password or role not in UserRole.values:
+                self.stderr.write(f"Skipping invalid row for login {login!r}.")
+                continue
+            rows.setdefault(login, (password, role))
+        taken = set(
+            User.objects.filter(username__in=rows).values_list("username", flat=True)
+        )
+        for login in taken:
+            self.stderr.write(f"Skipping taken login {login!r}.")
+            del rows[login]
+        # a few batches per process, so processes finish at about the same time
+        chunksize = max(len(rows) // (self.workers * 4), 1)
+        passwords = pool.map(
+            make_password,
+            [password for password, _ in rows.values()],
+            chunksize=chunksize,
+        )
+        users = [
+            User(username=login, password=password, role=role)
+            for (login, (_, role)), password in zip(rows.items(), passwords)
+        ]
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            Token.objects.bulk_create(
+                Token(key=Token.generate_key(), user=user) for user in users
+            )
+        return len(users)
+
+    @staticmethod
+    def read_csv(file):
+        yield from csv.DictReader(file)
+
+    @staticmethod
+    def read_jsonl(file):
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.tokens import expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete authentication tokens older than TOKEN_TTL setting."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of tokens deleted in a single transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Number of seconds to sleep between batches, to let other writes in.",
+        )
+
+    def handle(self, *args, **options):
+        # fixed threshold, so tokens expiring while purging do not prolong it
+        now = timezone.now()
+        batch_size = options["batch_size"]
+        purged = 0
+        while True:
+            # short delete per batch, so the write lock is never held for long
+            keys = list(expired_tokens(now).values_list("key", flat=True)[:batch_size])
+            if not keys:
+                break
+            purged += Token.objects.filter(key__in=keys).delete()[0]
+            if options["pause"]:
+                time.sleep(options["pause"])
+        self.stdout.write(f"Purged {purged} expired tokens.")
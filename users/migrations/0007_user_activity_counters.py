@@ -0,0 +1,44 @@
+# Generated by Django 3.2.25 on 2026-10-17 18:00
+
+from django.db import migrations, models
+from django.db.models import Count
+import users.models
+
+
+def count_activity(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    for user in User.objects.annotate(
+        rentals_count=Count("bikes", distinct=True),
+        reservations_count=Count("reservations", distinct=True),
+    ):
+        user.active_rentals = user.rentals_count
+        user.active_reservations = user.reservations_count
+        user.save(update_fields=["active_rentals", "active_reservations"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bikes", "0010_malfunction"),
+        ("users", "0006_user_rental_limit"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", users.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="active_rentals",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="active_reservations",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_activity, migrations.RunPython.noop),
+    ]
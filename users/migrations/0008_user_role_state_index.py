@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_user_activity_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["role", "state"], name="user_role_state_idx"),
+        ),
+    ]
@@ -1,7 +1,12 @@
-import uuid
-
-from django.contrib.auth.models import AbstractUser
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from django.db import models
+from django.db.models import F
+
+from core.cache import token_cache
+from core.queries import count_subquery
+from core.tokens import SignedToken
+from core.uuids import uuid7
 
 
 class UserRole(models.TextChoices):
@@ -15,8 +20,38 @@ class UserState(models.TextChoices):
     blocked = "blocked"
 
 
+class UserQuerySet(models.QuerySet):
+    def update_activity_counts(self) -> int:
+        """
+        Recompute rental and reservation counters of users in a single UPDATE.
+        """
+        from bikes.models import Bike, Reservation
+
+        return self.update(
+            active_rentals=count_subquery(Bike.objects.all(), "user"),
+            active_reservations=count_subquery(Reservation.objects.all(), "user"),
+        )
+
+    def add_activity(self, rentals: int = 0, reservations: int = 0) -> int:
+        """
+        Atomically shift rental and reservation counters of users by given amounts.
+        """
+        return self.update(
+            active_rentals=F("active_rentals") + rentals,
+            active_reservations=F("active_reservations") + reservations,
+        )
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
+# changed only by UPDATEs relative to the stored values, see UserQuerySet
+COUNTER_FIELDS = ("active_rentals", "active_reservations")
+
+
 class User(AbstractUser):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     role = models.CharField(
         max_length=5, choices=UserRole.choices, default=UserRole.user
     )
@@ -24,18 +59,52 @@ class User(AbstractUser):
         max_length=7, choices=UserState.choices, default=UserState.active
     )
     rental_limit = models.PositiveSmallIntegerField(default=4)
+    # denormalized counts of bikes rented and reserved by user, maintained by bikes
+    active_rentals = models.PositiveSmallIntegerField(default=0, editable=False)
+    active_reservations = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = UserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # user listings by role and blocked users
+            models.Index(fields=["role", "state"], name="user_role_state_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.role}, {self.state})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # role and state carried by signed tokens, see save
+        user._token_claims = (user.__dict__.get("role"), user.__dict__.get("state"))
+        return user
+
     @property
     def name(self) -> str:
         return f"{self.first_name} {self.last_name}"
 
+    def save(self, *args, **kwargs):
+        # counters of a user loaded earlier may be stale, never write them back
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        # role, state or limit might have changed
+        token_cache.invalidate_group(self.id)
+        claims = (self.role, self.state)
+        if settings.SIGNED_TOKENS and getattr(self, "_token_claims", claims) != claims:
+            SignedToken.revoke_user(self.id)
+        self._token_claims = claims
+
     def block(self):
         self.state = UserState.blocked
-        self.save()
+        self.save(update_fields=["state"])
 
     def unblock(self):
         self.state = UserState.active
-        self.save()
+        self.save(update_fields=["state"])
@@ -1,7 +1,25 @@
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import AsyncClient, override_settings
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.reverse import reverse
 
+from core.authentication import BearerTokenAuthentication
+from core.cache import TTLCache, token_cache
+from core.hashing import HashingPool, PoolSaturated
+from core.tokens import SignedToken
 from core.testcases import APITestCase
 from users.models import User, UserRole, UserState
 
@@ -398,3 +416,424 @@ class TechDeleteTestCase(APITestCase):
         )  # non-tech user
         response = self.client.delete(reverse("tech-detail", kwargs={"pk": user.id}))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TokenCacheTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.key}")
+
+    def test_cached_token_authenticates_without_queries(self):
+        self.client.get(reverse("user-list"))
+        # only the listing itself
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cached_user_loads_other_fields_lazily(self):
+        self.client.get(reverse("user-list"))
+        user, _ = BearerTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertEqual(user.role, self.user.role)
+        self.assertEqual(user.active_rentals, 0)
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.get(reverse("user-list"))
+        self.client.post(reverse("logout"))
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_role_change_invalidates_cached_token(self):
+        self.client.get(reverse("user-list"))
+        self.user.role = UserRole.user
+        self.user.save()
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_block_invalidates_cached_token(self):
+        self.client.get(reverse("user-list"))
+        self.user.block()
+        user, _ = BearerTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertEqual(user.state, UserState.blocked)
+
+    def test_expired_entries_are_dropped(self):
+        cache = TTLCache(timeout=0.01, max_size=10)
+        cache.set("key", "value")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("key"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = TTLCache(timeout=60, max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+
+@override_settings(SIGNED_TOKENS=True)
+class SignedTokenTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_authenticate(user=None)
+
+    def login(self, password="password"):
+        self.user.set_password(password)
+        self.user.save()
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": password}
+        )
+        token = response.data["token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return token
+
+    def test_login_returns_signed_token(self):
+        token = self.login()
+        self.assertEqual(SignedToken.verify(token).claims["id"], str(self.user.id))
+        self.assertFalse(Token.objects.filter(key=token).exists())
+
+    def test_register_returns_signed_token(self):
+        response = self.client.post(
+            reverse("register"), {"login": "new_user", "password": "password"}
+        )
+        claims = SignedToken.verify(response.data["token"]).claims
+        self.assertEqual(claims["role"], UserRole.user)
+
+    def test_signed_token_authenticates_without_queries(self):
+        self.login()
+        # only the listing itself
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_database_tokens_still_authenticate(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.key}")
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_logout_revokes_signed_token(self):
+        self.login()
+        response = self.client.post(reverse("logout"))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_block_revokes_issued_signed_tokens(self):
+        token = self.login()
+        self.user.block()
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.unblock()
+        # tokens issued later are valid again
+        self.assertNotEqual(self.login(), token)
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_save_keeps_signed_tokens(self):
+        self.login()
+        self.user.first_name = "Renamed"
+        self.user.save()
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_role_change_revokes_issued_signed_tokens(self):
+        self.login()
+        user = User.objects.get(id=self.user.id)
+        user.role = UserRole.tech
+        user.save()
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_register_does_not_grow_deny_list(self):
+        with mock.patch.object(SignedToken, "revoke_user") as revoke_user:
+            self.client.post(
+                reverse("register"), {"login": "new_user", "password": "password"}
+            )
+        revoke_user.assert_not_called()
+
+    def test_tampered_signed_token_is_rejected(self):
+        token = self.login()
+        tampered = token[:-1] + ("a" if token[-1] != "a" else "b")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tampered}")
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_signed_token_is_rejected(self):
+        self.login()
+        with override_settings(SIGNED_TOKEN_MAX_AGE=-1):
+            response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenExpiryTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.key}")
+
+    def expire(self, *tokens):
+        Token.objects.filter(key__in=[token.key for token in tokens]).update(
+            created=timezone.now() - timezone.timedelta(days=2)
+        )
+
+    def test_expired_token_is_rejected(self):
+        self.expire(self.token)
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_TTL=1)
+    def test_cached_token_is_rejected_once_expired(self):
+        self.client.get(reverse("user-list"))
+        time.sleep(1.1)
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_replaces_expired_token(self):
+        self.expire(self.token)
+        self.user.set_password("password")
+        self.user.save()
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "password"}
+        )
+        self.assertNotEqual(response.data["token"], self.token.key)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+    def test_login_replaces_token_close_to_expiry(self):
+        Token.objects.filter(key=self.token.key).update(
+            created=timezone.now() - timezone.timedelta(seconds=settings.TOKEN_TTL - 5)
+        )
+        # authenticated while still valid, so it is in the token cache
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.set_password("password")
+        self.user.save()
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "password"}
+        )
+        self.assertNotEqual(response.data["token"], self.token.key)
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['token']}")
+        response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_login_keeps_fresh_token(self):
+        self.user.set_password("password")
+        self.user.save()
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "password"}
+        )
+        self.assertEqual(response.data["token"], self.token.key)
+
+    def test_purge_deletes_only_expired_tokens(self):
+        expired = [
+            Token.objects.create(
+                user=User.objects.create_user(username=f"user_{i}", password="user")
+            )
+            for i in range(5)
+        ]
+        self.expire(*expired)
+        out = StringIO()
+        call_command("purge_expired_tokens", batch_size=2, stdout=out)
+        self.assertIn("Purged 5 expired tokens.", out.getvalue())
+        self.assertEqual(list(Token.objects.all()), [self.token])
+
+
+class PasswordHashingPoolTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=None)
+        self.user.set_password("password")
+        self.user.save()
+        self.pool = HashingPool(workers=1, max_queued=0)
+        for target in ("users.views.hashing_pool", "core.backends.hashing_pool"):
+            patcher = mock.patch(target, self.pool)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def saturate(self):
+        """
+        Occupy the only slot of the pool until the test ends.
+        """
+        release = threading.Event()
+        started = threading.Event()
+
+        def task():
+            started.set()
+            release.wait()
+
+        thread = threading.Thread(target=self.pool.run, args=(task,))
+        thread.start()
+        started.wait()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+
+    def test_login_hashes_in_pool(self):
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "password"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_login_with_wrong_password(self):
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "wrong"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_of_inactive_user(self):
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "password"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        PASSWORD_HASHERS=[
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+        ]
+    )
+    def test_login_upgrades_outdated_hash(self):
+        User.objects.filter(id=self.user.id).update(
+            password=make_password("password", hasher="md5")
+        )
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "password"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertTrue(self.user.check_password("password"))
+
+    def test_failed_login_sends_signal(self):
+        receiver = mock.Mock()
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "wrong"}
+        )
+        receiver.assert_called_once()
+
+    def test_registered_user_can_log_in(self):
+        self.client.post(reverse("register"), {"login": "new", "password": "secret"})
+        response = self.client.post(
+            reverse("login"), {"login": "new", "password": "secret"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_login_when_pool_is_saturated(self):
+        self.saturate()
+        response = self.client.post(
+            reverse("login"), {"login": self.user.username, "password": "password"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_register_when_pool_is_saturated(self):
+        self.saturate()
+        response = self.client.post(
+            reverse("register"), {"login": "new", "password": "secret"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(User.objects.filter(username="new").exists())
+
+    def test_pool_rejects_tasks_when_full(self):
+        self.assertEqual(self.pool.run(sum, [1, 2]), 3)
+        self.saturate()
+        with self.assertRaises(PoolSaturated):
+            self.pool.run(sum, [1, 2])
+
+
+@override_settings(ROOT_URLCONF="salty_bikes.asgi_urls")
+class AsyncPasswordHashingPoolTestCase(PasswordHashingPoolTestCase):
+    """
+    Same tests against async login and register of the ASGI entry point.
+    """
+
+    def test_login_and_register_await_pool(self):
+        # waiting for the pool in a thread is not allowed
+        with mock.patch.object(
+            self.pool, "run", side_effect=AssertionError
+        ), mock.patch.object(self.pool, "_submit", wraps=self.pool._submit) as submit:
+            response = self.client.post(
+                reverse("login"), {"login": self.user.username, "password": "password"}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.post(
+                reverse("register"), {"login": "new", "password": "secret"}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(submit.call_count, 2)
+
+    async def test_login_with_async_client(self):
+        response = await AsyncClient().post(
+            "/login",
+            {"login": self.user.username, "password": "password"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["role"], self.user.role)
+
+    def test_malformed_body(self):
+        response = self.client.post(
+            reverse("login"), "{", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_form_is_served_by_sync_view(self):
+        response = self.client.get(reverse("login"))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class ImportUsersTestCase(APITestCase):
+    def import_users(self, content, suffix, **options):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command(
+            "import_users", file.name, stdout=out, stderr=StringIO(), **options
+        )
+        return out.getvalue()
+
+    def test_import_csv(self):
+        out = self.import_users(
+            "login,password,role\nalice,secret,user\nbob,secret,tech\n",
+            ".csv",
+            workers=2,
+        )
+        self.assertIn("Imported 2 users, skipped 0", out)
+        alice = User.objects.get(username="alice")
+        self.assertTrue(alice.check_password("secret"))
+        self.assertEqual(User.objects.get(username="bob").role, UserRole.tech)
+        self.assertTrue(Token.objects.filter(user=alice).exists())
+
+    def test_import_jsonl_in_chunks(self):
+        content = "".join(
+            f'{{"login": "user_{i}", "password": "secret"}}\n' for i in range(5)
+        )
+        out = self.import_users(content, ".jsonl", workers=1, chunk_size=2)
+        self.assertIn("Imported 5 users", out)
+        self.assertEqual(
+            Token.objects.filter(user__username__startswith="user_").count(), 5
+        )
+
+    def test_import_skips_invalid_and_taken_logins(self):
+        out = self.import_users(
+            "login,password,role\n"
+            f"{self.user.username},secret,user\n"
+            "alice,,user\n"
+            "bob,secret,owner\n"
+            "carol,secret,\n"
+            "carol,other,\n",
+            ".csv",
+            workers=1,
+        )
+        self.assertIn("Imported 1 users, skipped 4", out)
+        self.assertTrue(User.objects.get(username="carol").check_password("secret"))
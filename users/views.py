@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate
 from django.http import Http404
 from drf_yasg.utils import swagger_auto_schema
@@ -11,8 +12,15 @@ from rest_framework.viewsets import GenericViewSet
 
 from drf_yasg import openapi
 
+from core.async_views import async_post_view
+from core.authentication import issue_token
+from core.backends import aauthenticate
+from core.cache import token_cache
 from core.decorators import restrict
+from core.hashing import PoolSaturated, hashing_pool
 from core.serializers import MessageSerializer, IdSerializer
+from core.views import ReplicaReadsMixin
+from core.tokens import SignedToken
 from users.models import User, UserRole, UserState
 from users.serializers import (
     RegisterRequestSerializer,
@@ -24,6 +32,58 @@ from users.serializers import (
 )
 
 
+def busy_response(message_serializer) -> Response:
+    return Response(
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        data=message_serializer(
+            data={"message": "Server is busy, try again later."}
+        ).initial_data,
+        headers={"Retry-After": "1"},
+    )
+
+
+def register_error_response(message: str) -> Response:
+    return Response(
+        status=status.HTTP_409_CONFLICT,
+        data=MessageSerializer(data={"message": message}).initial_data,
+    )
+
+
+def register_response(username: str, password: str) -> Response:
+    """
+    :param password: already hashed password
+    """
+    user = User.objects.create(username=username, password=password, role=UserRole.user)
+    return Response(
+        status=status.HTTP_200_OK,
+        data=RegisterResponseSerializer({"token": issue_token(user)}).data,
+    )
+
+
+def login_error_response() -> Response:
+    return Response(
+        status=status.HTTP_400_BAD_REQUEST,
+        data=MessageSerializer(data={"message": "Bad request."}).initial_data,
+    )
+
+
+def login_response(user) -> Response:
+    """
+    :param user: authenticated user, None for bad credentials
+    """
+    if not user:
+        return Response(
+            status=status.HTTP_401_UNAUTHORIZED,
+            data=MessageSerializer(data={"message": "Bad credentials."}).initial_data,
+        )
+    return Response(
+        status=status.HTTP_200_OK,
+        data=LoginResponseSerializer(
+            data={"token": issue_token(user), "role": user.role}
+        ).initial_data,
+    )
+
+
 class RegisterAPIView(APIView):
     permission_classes = (AllowAny,)  # no permissions needed to register
     authentication_classes = []
@@ -36,34 +96,20 @@ class RegisterAPIView(APIView):
         responses={
             200: openapi.Response("Successful response", response_serializer),
             409: openapi.Response("Errors", message_serializer),
+            503: openapi.Response("Server is busy", message_serializer),
         },
     )
     def post(self, request):
         ser = self.request_serializer(data=request.data)
         if not ser.is_valid():
-            return Response(
-                status=status.HTTP_409_CONFLICT,
-                data=self.message_serializer(
-                    data={"message": "Invalid request."}
-                ).initial_data,
-            )
+            return register_error_response("Invalid request.")
         if User.objects.filter(username=ser.data["login"]).exists():
-            return Response(
-                status=status.HTTP_409_CONFLICT,
-                data=self.message_serializer(
-                    data={"message": "Username already taken."}
-                ).initial_data,
-            )
-        user = User.objects.create_user(
-            username=ser.data["login"],
-            password=ser.data["password"],
-            role=UserRole.user,
-        )
-        token, _ = Token.objects.get_or_create(user=user)
-        return Response(
-            status=status.HTTP_200_OK,
-            data=self.response_serializer({"token": token.key}).data,
-        )
+            return register_error_response("Username already taken.")
+        try:
+            password = hashing_pool.make_password(ser.data["password"])
+        except PoolSaturated:
+            return busy_response(self.message_serializer)
+        return register_response(ser.data["login"], password)
 
 
 class LoginAPIView(APIView):
@@ -77,38 +123,21 @@ class LoginAPIView(APIView):
         responses={
             200: openapi.Response("Successful response", LoginResponseSerializer),
             401: openapi.Response("Bad credentials", message_serializer),
+            503: openapi.Response("Server is busy", message_serializer),
         }
     )
     def post(self, request, *args, **kwargs):
         # we wrap default DRF obtain_auth_token flow to be compliant with specification
         ser = self.request_serializer(data=request.data)
         if not ser.is_valid():
-            return Response(
-                status=status.HTTP_400_BAD_REQUEST,
-                data=self.message_serializer(
-                    data={"message": "Bad request."}
-                ).initial_data,
-            )
-        user = authenticate(
-            request=request,
-            username=ser.data["login"],
-            password=ser.data["password"],
-        )
-        if not user:
-            return Response(
-                status=status.HTTP_401_UNAUTHORIZED,
-                data=self.message_serializer(
-                    data={"message": "Bad credentials."}
-                ).initial_data,
+            return login_error_response()
+        try:
+            user = authenticate(
+                request, username=ser.data["login"], password=ser.data["password"]
             )
-        token, _ = Token.objects.get_or_create(user=user)
-
-        return Response(
-            status=status.HTTP_200_OK,
-            data=self.response_serializer(
-                data={"token": token.key, "role": user.role}
-            ).initial_data,
-        )
+        except PoolSaturated:
+            return busy_response(self.message_serializer)
+        return login_response(user)
 
 
 class LogoutAPIView(APIView):
@@ -121,7 +150,13 @@ class LogoutAPIView(APIView):
     )
     @restrict(UserRole.user, UserRole.tech, UserRole.admin)
     def post(self, request, *args, **kwargs):
-        Token.objects.get(user=request.user).delete()
+        if isinstance(request.auth, SignedToken):
+            request.auth.revoke()
+        else:
+            token = Token.objects.get(user=request.user)
+            key = token.key
+            token.delete()
+            token_cache.invalidate(key)
         return Response(
             status=status.HTTP_204_NO_CONTENT,
             data=self.message_serializer(
@@ -143,6 +178,7 @@ class UserListAPIView(ListAPIView):
 
 
 class UserBlockedViewSet(
+    ReplicaReadsMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -222,6 +258,7 @@ class UserBlockedViewSet(
 
 
 class TechViewSet(
+    ReplicaReadsMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
@@ -303,3 +340,35 @@ class TechViewSet(
             )
         user.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# async versions of login and register, served by the ASGI entry point, which await
+# the hashing pool instead of holding a thread until the password is hashed
+
+
+@async_post_view(fallback=RegisterAPIView.as_view())
+async def register(request):
+    ser = RegisterRequestSerializer(data=request.data)
+    if not ser.is_valid():
+        return register_error_response("Invalid request.")
+    if await sync_to_async(User.objects.filter(username=ser.data["login"]).exists)():
+        return register_error_response("Username already taken.")
+    try:
+        password = await hashing_pool.amake_password(ser.data["password"])
+    except PoolSaturated:
+        return busy_response(MessageSerializer)
+    return await sync_to_async(register_response)(ser.data["login"], password)
+
+
+@async_post_view(fallback=LoginAPIView.as_view())
+async def login(request):
+    ser = LoginRequestSerializer(data=request.data)
+    if not ser.is_valid():
+        return login_error_response()
+    try:
+        user = await aauthenticate(
+            request, username=ser.data["login"], password=ser.data["password"]
+        )
+    except PoolSaturated:
+        return busy_response(MessageSerializer)
+    return await sync_to_async(login_response)(user)